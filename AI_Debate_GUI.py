@@ -1,21 +1,31 @@
-from groq import Groq
+import asyncio
 import time
 import random
 import gradio as gr
 import os
-from datetime import datetime, timedelta
-from collections import defaultdict
+from debate_engine import Debate, DebateLLM
+from length_governor import LengthPolicy
+from model_router import ModelRouter
+from personas import load_personas
+from debate_metrics import DebateMetrics
+from debate_pacing import Pacer
+from debate_rooms import RoomHub
+from debate_scheduler import DebateScheduler
+from debate_scoring import DebateScorer
+from groq_client import get_async_client, warm_up_async
+from rate_limiter import SessionRateLimiter, UpstreamLimiter
+from resilient_calls import CircuitBreaker, ResilientCaller
+from response_cache import ResponseCache
+from transcript_store import TranscriptStore
 
 # ============================================
 # SECURITY: API KEY FROM ENVIRONMENT VARIABLE
 # ============================================
 # The API key is now loaded from an environment variable, NOT hardcoded
 # This keeps it secure when sharing the code
+# (checked when the GUI starts, so the module itself can be imported without it)
 API_KEY = os.getenv("GROQ_API_KEY")
 
-if not API_KEY:
-    raise ValueError("ERROR: GROQ_API_KEY environment variable not set! See instructions in comments.")
-
 
 # ============================================
 # RATE LIMITING CONFIGURATION
@@ -24,212 +34,567 @@ PASSWORD = "debate2024"  # Change this to your desired password
 MAX_DEBATES_PER_HOUR = 3
 MAX_ROUNDS_PER_HOUR = 7
 
-# Store rate limit data: {user_id: {"debates": [(timestamp, rounds)], "total_rounds": count}}
-rate_limit_data = defaultdict(lambda: {"debates": [], "total_rounds": 0})
+# Sessions idle this long are forgotten; at most MAX_TRACKED_SESSIONS are kept
+SESSION_IDLE_TIMEOUT = 3600
+MAX_TRACKED_SESSIONS = 10000
 
+# Global limits on calls to Groq shared by every session - match these to your Groq plan
+UPSTREAM_REQUESTS_PER_MINUTE = 1000
+UPSTREAM_TOKENS_PER_MINUTE = 300000
 
-def check_rate_limit(session_id, num_rounds):
-    """Check if user has exceeded rate limits"""
-    now = datetime.now()
-    one_hour_ago = now - timedelta(hours=1)
+# Stream each bot's reply token-by-token into the live output
+STREAM_RESPONSES = True
 
-    # Clean up old entries
-    user_data = rate_limit_data[session_id]
-    user_data["debates"] = [(ts, rds) for ts, rds in user_data["debates"] if ts > one_hour_ago]
+# Reading pace. Debates are generated at full speed (freeing their slot sooner)
+# and replayed to the viewer at this pace; 0 / None = show everything at once
+TURN_PAUSE_SECONDS = 0.3        # Pause after each turn (sequential rounds)
+READING_WORDS_PER_SECOND = None # e.g. 6 to also slow streamed text to reading speed
 
-    # Recalculate total rounds in last hour
-    user_data["total_rounds"] = sum(rds for _, rds in user_data["debates"])
+# Default for the "simultaneous rounds" checkbox: every bot answers the same
+# snapshot of the debate at once, so a round costs one LLM call of latency
+SIMULTANEOUS_ROUNDS = False
 
-    # Check limits
-    num_debates = len(user_data["debates"])
-    total_rounds = user_data["total_rounds"]
+# ============================================
+# SERVER CONCURRENCY CONFIGURATION
+# ============================================
+# Debates run as async generators, so one worker can host many of them at once
+MAX_CONCURRENT_DEBATES = 50
+# Debates past that wait in a fair-share queue (each visitor gets a turn) and see
+# their place in line and an ETA; past MAX_QUEUED_DEBATES new ones are turned away
+MAX_QUEUED_DEBATES = 100
+# Global cap on Groq requests in flight across all debates in this process
+MAX_CONCURRENT_LLM_CALLS = 16
+
+# HTTP connection pool to Groq - sized to MAX_CONCURRENT_LLM_CALLS so every
+# in-flight call has a warm connection ready
+KEEPALIVE_SECONDS = 120  # How long idle connections stay open for reuse
+USE_HTTP2 = False        # Needs: pip install "httpx[http2]"
+WARMUP_CONNECTIONS = 4   # Connections opened before the first debate
 
-    if num_debates >= MAX_DEBATES_PER_HOUR:
-        return False, f"❌ Rate limit exceeded: {num_debates}/{MAX_DEBATES_PER_HOUR} debates used this hour. Try again later!"
+# ============================================
+# CONTEXT WINDOW CONFIGURATION
+# ============================================
+# Bots see the last CONTEXT_RECENT_TURNS turns word-for-word plus a rolling
+# summary of everything older, kept under CONTEXT_TOKEN_BUDGET tokens. Each bot
+# also gets up to CONTEXT_MENTION_TURNS older turns that mention it by name.
+CONTEXT_RECENT_TURNS = 8
+CONTEXT_TOKEN_BUDGET = 1500
+SUMMARY_MAX_TOKENS = 200
+CONTEXT_MENTION_TURNS = 3
+# Send the debate as one chat message per turn that only grows at the end, with a
+# fixed system prompt per bot, so Groq can reuse the prompt prefix it already read
+# (faster first token, cached tokens are billed at a discount)
+APPEND_ONLY_PROMPTS = True
 
-    if total_rounds + num_rounds > MAX_ROUNDS_PER_HOUR:
-        remaining = MAX_ROUNDS_PER_HOUR - total_rounds
-        return False, f"❌ Rate limit exceeded: You've used {total_rounds}/{MAX_ROUNDS_PER_HOUR} rounds this hour. Only {remaining} rounds remaining!"
+# ============================================
+# MODEL & CACHE CONFIGURATION
+# ============================================
+MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.8
+MAX_TOKENS = 1024
+
+# Model routing: pick the model per bot and round instead of always using MODEL.
+# Each entry lists models best-first; "final" covers closing statements,
+# "summary" the context summaries, a bot's name (or "Name:final") just that bot.
+# A model that is rate limited, erroring or slower than SLOW_MODEL_SECONDS
+# (SLOW_FIRST_TOKEN_SECONDS to the first token for streamed replies) is
+# skipped for the next one in its list until it recovers.
+MODEL_ROUTING = True
+MODEL_ROUTES = {
+    "default": ["llama-3.1-8b-instant", MODEL],
+    "final": [MODEL, "llama-3.1-8b-instant"],
+    "summary": ["llama-3.1-8b-instant", MODEL],
+}
+SLOW_MODEL_SECONDS = 4.0        # Full (non-streamed) replies and summaries
+SLOW_FIRST_TOKEN_SECONDS = 1.5  # Streamed replies, judged on time to first token
+
+# Reply length: bots are asked for 2-3 sentences, so don't let them run to 1024 tokens.
+# Replies stop at another bot's "Name:" label, and streamed replies are cut off
+# (and the request closed) as soon as MAX_SENTENCES sentences are done.
+REPLY_MAX_TOKENS = 160
+FINAL_REPLY_MAX_TOKENS = 220
+MAX_SENTENCES = 3
+STOP_AT_OTHER_SPEAKERS = True
+
+# Identical prompts are answered from memory / a local SQLite file instead of
+# calling Groq again. CACHE_REPLAY=True never expires entries and fixes the
+# speaking order per topic, so re-running a topic replays the same debate.
+CACHE_ENABLED = True
+CACHE_DB_PATH = "response_cache.sqlite3"
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_MEMORY_ENTRIES = 512
+CACHE_MAX_DB_ENTRIES = 10000
+CACHE_REPLAY = False
 
-    return True, "OK"
+# ============================================
+# TRANSCRIPT CONFIGURATION
+# ============================================
+# Each debate is saved turn by turn to transcripts/<id>.jsonl. Starting the
+# same debate again after a crash or Groq outage reuses the saved replies.
+TRANSCRIPT_DIR = "transcripts"
+RESUME_INTERRUPTED = True
 
+# ============================================
+# SPECTATOR ROOMS
+# ============================================
+# Every debate gets a room with a shareable link. Anyone can watch it live from
+# the link (late joiners catch up on everything so far) with no password and
+# no extra Groq calls - the debate is generated once, however many people watch.
+JOIN_LIVE_DEBATES = True   # Starting a debate that's already running (same topic, rounds, mode) watches it instead
+MAX_ROOMS = 200            # Finished rooms past this are forgotten, oldest first
+ROOM_KEEP_SECONDS = 3600   # How long a finished debate stays watchable
+MAX_SPECTATORS = 1000      # Spectator streams at once
 
-def record_usage(session_id, num_rounds):
-    """Record a debate usage"""
-    rate_limit_data[session_id]["debates"].append((datetime.now(), num_rounds))
-    rate_limit_data[session_id]["total_rounds"] += num_rounds
+# ============================================
+# GROQ RESILIENCE CONFIGURATION
+# ============================================
+GROQ_TIMEOUT_SECONDS = 30      # Give up on a single call after this long
+GROQ_MAX_RETRIES = 4           # Retries for 429s, 5xx and dropped connections
+HEDGE_REQUESTS = True          # Fire a backup request when a call is slower than the recent p95
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before we stop calling Groq...
+BREAKER_RESET_SECONDS = 30     # ...and how long to wait before trying again
+
+# ============================================
+# METRICS CONFIGURATION
+# ============================================
+# Per-call latency / TTFT / queue wait / token histograms, served in the
+# Prometheus text format at http://<host>:METRICS_PORT/metrics
+ENABLE_METRICS_ENDPOINT = True
+METRICS_PORT = 9464
+
+# Per-session sliding windows (debates/rounds in the last hour)
+session_limiter = SessionRateLimiter(
+    MAX_DEBATES_PER_HOUR,
+    MAX_ROUNDS_PER_HOUR,
+    window_seconds=3600,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    max_sessions=MAX_TRACKED_SESSIONS,
+)
+
+# Global Groq budget shared by all sessions
+upstream_limiter = UpstreamLimiter(UPSTREAM_REQUESTS_PER_MINUTE, UPSTREAM_TOKENS_PER_MINUTE)
+
+
+def check_rate_limit(session_id, num_rounds):
+    """Check if user has exceeded rate limits, and record the debate if not"""
+    allowed, num_debates, total_rounds = session_limiter.try_record(session_id, num_rounds)
+    if allowed:
+        return True, "OK"
+
+    if num_debates >= MAX_DEBATES_PER_HOUR:
+        return False, f"❌ Rate limit exceeded: {num_debates}/{MAX_DEBATES_PER_HOUR} debates used this hour. Try again later!"
+
+    remaining = MAX_ROUNDS_PER_HOUR - total_rounds
+    return False, f"❌ Rate limit exceeded: You've used {total_rounds}/{MAX_ROUNDS_PER_HOUR} rounds this hour. Only {remaining} rounds remaining!"
 
 
 # ============================================
 # AI PARTICIPANTS
 # ============================================
-AI_PARTICIPANTS = [
-    {
-        "name": "TrollBot",
-        "personality": "You are a chaos agent whose goal is to derail the conversation and cause havoc. You make absurd arguments, deliberately misinterpret others, bring up completely irrelevant points, and generally be a persistent nuisance. You're not mean-spirited, just annoying and chaotic.",
-        "color": "🔵"
-    },
-    {
-        "name": "LogicalBot",
-        "personality": "You are a logical thinker who values consistency and rational arguments. You often point out logical fallacies and contradictions in others' arguments.",
-        "color": "🟢"
-    },
-    {
-        "name": "EmpathyBot",
-        "personality": "You are deeply empathetic and focus on emotional intelligence and personal experiences. You value compassion and understanding above strict logic.",
-        "color": "🟡"
-    },
-    {
-        "name": "SkepticBot",
-        "personality": "You are a skeptic who questions everything and plays devil's advocate. You challenge assumptions, demand evidence, and aren't easily convinced by emotional or logical arguments alone. You tend to reply in a sassy tone to ideas you reject as fact.",
-        "color": "🔴"
-    }
-]
-
-# Initialize Groq client
-client = Groq(api_key=API_KEY)
-
-
-def get_ai_response(ai_participant, conversation_context, is_final_round=False):
-    """Get response from AI participant"""
-    final_round_instruction = ""
-    if is_final_round:
-        final_round_instruction = """
-
-FINAL ROUND - CONCLUDING STATEMENT:
-- This is your last chance to speak
-- Give your final opinion on the debate topic
-- You may acknowledge who made the strongest points (by name)
-- Wrap up your argument concisely
-"""
-
-    system_prompt = f"""{ai_participant['personality']}
-
-You are {ai_participant['name']} in a debate about the given topic.
-
-CRITICAL RULES - DO NOT BREAK THESE:
-- The ONLY participants are: TrollBot, LogicalBot, EmpathyBot, SkepticBot
-- When talking about yourself, use "I", "me", "my" - NEVER use your own name ({ai_participant['name']})
-- When addressing others, use their exact names ONLY
-- NEVER invent new participants, names, or people
-- If someone isn't in the list above, they don't exist in this debate
-- NEVER describe your approach (no "as a utilitarian", "from my perspective", etc.)
-- Just make your argument directly and confidently
-
-DEBATE STYLE:
-- Be direct and assertive - state your position clearly
-- Challenge others specifically by name
-- 2-3 punchy sentences maximum
-- No hedging, no apologizing, no over-explaining
-- If you disagree, say why and move on
-- Sound like a real person arguing their point, not a bot following a script{final_round_instruction}
-"""
-
-    user_message = f"""Here's the conversation so far:
-
-{conversation_context}
-
-Now it's your turn to respond. What's your take?"""
-
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ],
-        model="llama-3.3-70b-versatile",
-        temperature=0.8,
-        max_tokens=1024,
+# The bots are read from a JSON file (see personas.py) - try "personas_large_panel.json"
+# for a 12-bot panel. Prompts live in debate_engine.py (shared with the terminal version)
+PERSONAS_FILE = "personas.json"
+AI_PARTICIPANTS = [dict(p, color=p["emoji"]) for p in load_personas(PERSONAS_FILE)]
+
+
+def make_client():
+    """Build the pooled async Groq client (shared by every debate in this process)"""
+    if not API_KEY:
+        raise ValueError("ERROR: GROQ_API_KEY environment variable not set! See instructions in comments.")
+    return get_async_client(
+        API_KEY,
+        pool_size=MAX_CONCURRENT_LLM_CALLS,
+        keepalive_expiry=KEEPALIVE_SECONDS,
+        http2=USE_HTTP2,
+        timeout=GROQ_TIMEOUT_SECONDS,
     )
 
-    return chat_completion.choices[0].message.content
 
+# Retries, timeouts, hedging and circuit breaking for every Groq call
+groq_caller = ResilientCaller(
+    max_retries=GROQ_MAX_RETRIES,
+    timeout=GROQ_TIMEOUT_SECONDS,
+    hedge=HEDGE_REQUESTS,
+    breaker=CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS),
+)
+
+# Latency and token metrics for every Groq call
+metrics = DebateMetrics()
+metrics.add_gauge("llm_retries", "Groq calls retried after an error", lambda: groq_caller.retries)
+metrics.add_gauge("llm_hedges", "Hedged backup requests sent", lambda: groq_caller.hedges)
+metrics.add_gauge("tracked_sessions", "Sessions held by the rate limiter", lambda: len(session_limiter))
+
+# Runs debates in their own tasks so they can be stopped (Stop button, closed tab)
+scheduler = DebateScheduler(MAX_CONCURRENT_DEBATES, max_queued=MAX_QUEUED_DEBATES)
+metrics.add_gauge("debates_running", "Debates running right now", lambda: len(scheduler.running))
+metrics.add_gauge("debates_queued", "Debates waiting for a free slot", lambda: len(scheduler.queued))
+metrics.add_gauge("debates_cancelled", "Debates stopped before they finished", lambda: scheduler.cancelled_jobs)
+
+# Spectator rooms: each debate's events are published once and fanned out to every viewer
+rooms = RoomHub(max_rooms=MAX_ROOMS, keep_seconds=ROOM_KEEP_SECONDS)
+metrics.add_gauge("rooms_live", "Debates running in spectator rooms", rooms.live_rooms)
+metrics.add_gauge("spectators", "Viewers subscribed to a room", rooms.spectators)
+
+# Set by Stop (or closing the tab) so that visitor's playback ends at once, even
+# if the debate has already been generated and is only being shown at reading pace
+stop_signals = {}  # session id -> asyncio.Event
+
+# Latency-aware model choice per bot and round (None = always MODEL)
+model_router = None
+if MODEL_ROUTING:
+    model_router = ModelRouter(MODEL_ROUTES, slow_seconds=SLOW_MODEL_SECONDS,
+                                slow_first_token_seconds=SLOW_FIRST_TOKEN_SECONDS)
+    metrics.add_gauge(
+        "models_cooling_down", "Models skipped after rate limits or errors",
+        lambda: sum(1 for stats in model_router.snapshot().values() if stats["cooling_down"]),
+    )
+
+# Shared response cache (None when caching is turned off)
+response_cache = None
+if CACHE_ENABLED:
+    response_cache = ResponseCache(
+        db_path=CACHE_DB_PATH,
+        max_memory_entries=CACHE_MAX_MEMORY_ENTRIES,
+        max_db_entries=CACHE_MAX_DB_ENTRIES,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        replay=CACHE_REPLAY,
+    )
+
+# Every Groq call from every session goes through here: the global limits,
+# at most MAX_CONCURRENT_LLM_CALLS requests in flight, the cache and the metrics.
+# The client itself is only built on the first call.
+llm = DebateLLM(
+    make_client,
+    groq_caller,
+    upstream_limiter=upstream_limiter,
+    max_concurrent_calls=MAX_CONCURRENT_LLM_CALLS,
+    cache=response_cache,
+    model=MODEL,
+    temperature=TEMPERATURE,
+    max_tokens=MAX_TOKENS,
+    metrics=metrics,
+    router=model_router,
+)
+
+# How long each bot's turn may get
+length_policy = LengthPolicy(
+    reply_tokens=REPLY_MAX_TOKENS,
+    final_reply_tokens=FINAL_REPLY_MAX_TOKENS,
+    max_sentences=MAX_SENTENCES,
+    stop_at_other_speakers=STOP_AT_OTHER_SPEAKERS,
+)
+
+# Append-only per-turn transcripts (used to resume interrupted debates)
+transcript_store = TranscriptStore(TRANSCRIPT_DIR)
+
+
+def message(text, role="system"):
+    """One message for the live output (bots speak as "assistant", everything else is "system")"""
+    return {"role": role, "content": text}
+
+
+class DebateView:
+    """Turns debate events into the GUI's output, timer and standings (for hosts and spectators alike)"""
+
+    def __init__(self, room, progress=None):
+        self.room = room
+        self.progress = progress
+        self.start_time = room.created_at
+
+        # The live output is a list of chat messages that only ever grows at the end.
+        # Gradio sends the browser just what changed since the last frame, so each
+        # update carries one new message or the few words added to the one streaming in.
+        participant_list = " | ".join(f"{ai['name']} {ai['color']}" for ai in AI_PARTICIPANTS)
+        self.messages = [message(
+            f"🎭 **AI DEBATE CHATROOM** 🎭\n\n"
+            f"**Topic:** {room.topic}\n"
+            f"**Rounds:** {room.num_rounds}\n"
+            f"**Participants:** {participant_list}"
+        )]
+        self.streaming = {}  # (round, name) -> index of the reply streaming in right now
+
+        # Scores update as each message is shown (shown live in the standings box).
+        # Generation can be a turn or two ahead, so count only what the viewer has seen.
+        self.scorer = DebateScorer(ai["name"] for ai in AI_PARTICIPANTS)
+        self.standings = ""
+
+        self.total_steps = room.num_rounds * len(AI_PARTICIPANTS)
+        self.current_step = 0
+
+    def note(self, text):
+        """Add a line from the app (not a bot) to the output"""
+        self.messages.append(message(text))
+
+    def apply(self, event):
+        """Take in one debate event; returns True if there's something new to show"""
+        ai = event.get("participant")
+
+        if event["type"] == "round":
+            if event["final"]:
+                self.note("**🏁 FINAL ROUND: Closing Statements**")
+            else:
+                self.note(f"**Round {event['round'] + 1}**")
+            return True
+
+        if event["type"] == "speaking":
+            self._progress(f"Round {event['round'] + 1}: {ai['name']} speaking...")
+            return False
+
+        if event["type"] == "chunk":
+            # Push partial text to the viewer as tokens arrive
+            self._say(event, streaming=True)
+            return True
+
+        if event["type"] == "turn":
+            self.current_step += 1
+            if self.room.simultaneous:
+                self._progress(f"Round {event['round'] + 1}: {ai['name']} finished")
+
+            self._say(event, streaming=False)
+            self.scorer.add_message(ai["name"], event["text"], event["round"])
+            self.standings = format_scores(self.scorer)
+            return True
+        return False
+
+    def frame(self, extra=None):
+        """The three GUI outputs right now; `extra` is a status line shown at the bottom"""
+        shown = list(self.messages) if extra is None else self.messages + [message(extra)]
+        return shown, format_time(time.time() - self.start_time), self.standings
+
+    def finish(self):
+        """Final frame with the scoring"""
+        scoring = f"🏆 **DEBATE SCORING** 🏆\n\n{self.standings}"
+        mention_graph = self.scorer.format_mentions()
+        if mention_graph:
+            scoring += f"\n**Who called out whom:**\n{mention_graph}"
+        self.note(scoring)
+
+        final_time = format_time(time.time() - self.start_time)
+        self.note(f"✅ **Debate Complete!** Total time: {final_time}")
+        return list(self.messages), final_time, self.standings
+
+    def _say(self, event, streaming):
+        # A streamed reply is one message, updated in place until its turn is done
+        ai = event["participant"]
+        key = (event["round"], ai["name"])
+        said = message(f"{ai['color']} **{ai['name']}:** {event['text']}", role="assistant")
+        index = self.streaming.pop(key, None)
+        if index is None:
+            index = len(self.messages)
+            self.messages.append(said)
+        else:
+            self.messages[index] = said
+        if streaming:
+            self.streaming[key] = index
 
-def run_debate_with_gui(topic, num_rounds, password, session_id, progress=gr.Progress()):
+    def _progress(self, desc):
+        if self.progress:
+            self.progress(self.current_step / self.total_steps, desc=desc)
+
+
+async def run_debate_with_gui(topic, num_rounds, password, session_id, simultaneous=False,
+                              request: gr.Request = None, progress=gr.Progress()):
     """Run the debate with real-time updates for the GUI"""
 
     # Verify password
     if password != PASSWORD:
-        yield "❌ **INCORRECT PASSWORD!** Access denied.\n\nPlease enter the correct password to use this tool.", "00:00", ""
+        yield [message("❌ **INCORRECT PASSWORD!** Access denied.\n\nPlease enter the correct password to use this tool.")], "00:00", ""
         return
 
-    # Check rate limits
-    allowed, message = check_rate_limit(session_id, num_rounds)
-    if not allowed:
-        yield message, "00:00", ""
+    # Stop and closing the tab act on everything this session started or joined
+    viewer = request.session_hash if request else session_id
+
+    # Someone is already running this exact debate - watch theirs instead of paying for a second one
+    if JOIN_LIVE_DEBATES:
+        room = rooms.find_live(topic, num_rounds, simultaneous)
+        if room is not None:
+            note = f"👀 **Joined a debate on this topic that's already running** (room `{room.room_id}`)"
+            # Hold the debate too, so it keeps going if whoever started it stops watching
+            scheduler.hold(room.job, viewer)
+            try:
+                async for frame in spectate(room, progress, note, viewer, stop_signal(viewer)):
+                    yield frame
+            finally:
+                scheduler.release(room.job, viewer)
+            return
+
+    if scheduler.full:
+        yield [message("🚦 **The server is at capacity.** Please try again in a few minutes.")], "00:00", ""
         return
 
-    # Record this usage
-    record_usage(session_id, num_rounds)
+    # Check rate limits (this also records the usage)
+    allowed, reason = check_rate_limit(session_id, num_rounds)
+    if not allowed:
+        yield [message(reason)], "00:00", ""
+        return
 
-    start_time = time.time()
+    # Every turn is saved as soon as it's made; an interrupted debate picks up where it stopped
+    transcript = await asyncio.to_thread(
+        transcript_store.open, topic, num_rounds, AI_PARTICIPANTS, simultaneous, resume=RESUME_INTERRUPTED
+    )
 
-    output = f"{'=' * 60}\n🎭 **AI DEBATE CHATROOM** 🎭\n{'=' * 60}\n"
-    output += f"**Topic:** {topic}\n"
-    output += f"**Rounds:** {num_rounds}\n"
-    output += f"**Participants:** TrollBot 🔵 | LogicalBot 🟢 | EmpathyBot 🟡 | SkepticBot 🔴\n"
-    output += f"{'=' * 60}\n\n"
+    # Every debate is published to a room that anyone with the link can watch. No
+    # awaits from here until room.job is set, so nobody can join a room without a job
+    room = rooms.open(topic, num_rounds, simultaneous)
+    view = DebateView(room, progress)
+    view.note(f"🔗 **Spectators can watch at:** {room_link(room.room_id, request)}")
+    if transcript.resumed:
+        view.note(f"♻️ **Resuming an interrupted debate** - reusing {transcript.saved_turns} saved replies")
+
+    debate = Debate(
+        topic,
+        num_rounds,
+        llm,
+        participants=AI_PARTICIPANTS,
+        simultaneous=simultaneous,
+        stream=STREAM_RESPONSES,
+        # In replay mode the speaking order is seeded from the topic so cached
+        # replies line up with the same prompts every run
+        rng=random.Random(topic) if CACHE_REPLAY else None,
+        transcript=transcript,
+        recent_turns=CONTEXT_RECENT_TURNS,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        summary_max_tokens=SUMMARY_MAX_TOKENS,
+        length_policy=length_policy,
+        mention_turns=CONTEXT_MENTION_TURNS,
+        append_only_prompts=APPEND_ONLY_PROMPTS,
+    )
+    pacer = Pacer(0 if simultaneous else TURN_PAUSE_SECONDS, READING_WORDS_PER_SECOND)
+
+    # The debate runs as a scheduler job; the Stop button and closing the tab cancel it
+    # (once every session that started it has stopped)
+    job = scheduler.submit(viewer, lambda: room.broadcast(debate.run()), num_rounds)
+    if job is None:
+        transcript.close()
+        room.close("stopped")
+        yield view.frame("🚦 **The server is at capacity.** Please try again in a few minutes.")
+        return
+    room.job = job
+
+    # The debate can outlive this page (others may have joined it), so it's
+    # wrapped up when the job ends rather than when this generator does.
+    # If it stopped early its saved turns stay resumable.
+    def wrap_up(job):
+        transcript.close()
+        room.close("stopped")  # No-op if the debate already closed its room
+
+    job.callbacks.append(wrap_up)
+
+    yield view.frame()
+
+    try:
+        # Stop drops whatever is still buffered instead of playing it out first
+        async for event in pacer.replay(scheduler.updates(job), stop=stop_signal(viewer)):
+            if event["type"] == "queued":
+                yield view.frame(
+                    f"⏳ **Waiting for a free slot** - you're #{event['position']} in line "
+                    f"(about {format_time(event['eta'])} to go)"
+                )
+            elif view.apply(event):
+                yield view.frame()
+    except Exception as error:
+        # Retries are already exhausted (or the circuit breaker is open) - stop cleanly
+        yield view.frame(upstream_error_message(error))
+        return
 
-    yield output, "00:00", ""
+    if job.state != "done":
+        if job.holders:
+            # Stopped while others who asked for the same debate are still watching it
+            yield view.frame("⏹️ **You stopped watching.** The debate goes on for the others who started it.")
+        else:
+            yield view.frame("⏹️ **Debate stopped.** Start the same debate again to pick up where it stopped.")
+        return
 
-    full_conversation = (
-        "DEBATE PARTICIPANTS: TrollBot, LogicalBot, EmpathyBot, SkepticBot.\n"
-        "No other participants exist.\n\n"
-        f"DEBATE TOPIC: {topic}\n\n"
-    )
+    yield view.finish()
 
-    total_steps = num_rounds * len(AI_PARTICIPANTS)
-    current_step = 0
 
-    for round_num in range(num_rounds):
-        is_final_round = (round_num == num_rounds - 1)
+async def watch_debate(room_id, progress=gr.Progress()):
+    """Watch a debate from its room code / shared link (no password, no Groq calls)"""
+    if not room_id or not room_id.strip():
+        yield gr.skip(), gr.skip(), gr.skip()
+        return
 
-        if is_final_round:
-            output += f"\n{'─' * 60}\n**🏁 FINAL ROUND: Closing Statements**\n{'─' * 60}\n\n"
-        else:
-            output += f"\n{'─' * 60}\n**Round {round_num + 1}**\n{'─' * 60}\n\n"
+    room = rooms.get(room_id)
+    if room is None:
+        yield [message("❓ **No debate with that room code.** It may have finished more than an hour ago.")], "00:00", ""
+        return
 
-        yield output, format_time(time.time() - start_time), ""
+    async for frame in spectate(room, progress):
+        yield frame
 
-        round_order = AI_PARTICIPANTS.copy()
-        random.shuffle(round_order)
 
-        for ai in round_order:
-            current_step += 1
-            progress(current_step / total_steps, desc=f"Round {round_num + 1}: {ai['name']} speaking...")
+async def spectate(room, progress=None, note="", session_id=None, stop=None):
+    """Follow a room: catch up on the backlog at once, then show live turns at reading pace (until `stop` is set)"""
+    view = DebateView(room, progress)
+    if note:
+        view.note(note)
+    pacer = Pacer(0 if room.simultaneous else TURN_PAUSE_SECONDS, READING_WORDS_PER_SECOND)
 
-            response = get_ai_response(ai, full_conversation, is_final_round)
-            message = f"{ai['color']} **{ai['name']}:** {response}\n\n"
+    async for event in pacer.replay(room.subscribe(session_id), stop=stop):
+        if event["type"] == "backlog":
+            for past in event["events"]:
+                view.apply(past)
+            yield view.frame()
+        elif view.apply(event):
+            yield view.frame()
 
-            output += message
-            full_conversation += f"{ai['name']}: {response}\n\n"
+    if room.status == "done":
+        yield view.finish()
+    elif room.live:
+        yield view.frame("⏹️ **You stopped watching.**")  # Detached by the Stop button
+    else:
+        yield view.frame("⏹️ **The debate was stopped before the end.**")
 
-            elapsed = format_time(time.time() - start_time)
-            yield output, elapsed, ""
 
-            time.sleep(0.3)
+def room_link(room_id, request=None):
+    """Shareable link that opens the app watching this room"""
+    page = request.headers.get("referer", "") if request else ""
+    return f"{page.split('?')[0]}?room={room_id}"
 
-    # Calculate scores
-    output += f"\n{'=' * 60}\n🏆 **DEBATE SCORING** 🏆\n{'=' * 60}\n\n"
 
-    scores = {}
-    for ai in AI_PARTICIPANTS:
-        mentions = full_conversation.count(ai['name']) - num_rounds
-        scores[ai['name']] = max(0, mentions)
+def room_from_url(request: gr.Request):
+    """Room code from a shared link (?room=...)"""
+    return request.query_params.get("room", "")
 
-    sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
+def format_scores(scorer):
+    """Format the current standings, one line per bot"""
     score_display = ""
-    for rank, (name, score) in enumerate(sorted_scores, 1):
+    for rank, (name, score) in enumerate(scorer.standings(), 1):
         medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
         ai_emoji = next(ai['color'] for ai in AI_PARTICIPANTS if ai['name'] == name)
-        score_line = f"{medal} **#{rank} - {name}** {ai_emoji}: {score} engagement points\n"
-        output += score_line
-        score_display += score_line
+        score_display += f"{medal} **#{rank} - {name}** {ai_emoji}: {score} engagement points\n"
+    return score_display
+
+
+async def stop_debate(request: gr.Request):
+    """Cancel this visitor's queued or running debate (also runs when the tab is closed)"""
+    # Debates someone else also started keep going for them - this visitor just stops watching
+    scheduler.cancel_session(request.session_hash)
+    rooms.detach(request.session_hash)
+    stop = stop_signals.pop(request.session_hash, None)
+    if stop:
+        stop.set()
+
+
+def stop_signal(session_id):
+    """The event Stop sets for this visitor; shared by everything they're watching until then"""
+    return stop_signals.setdefault(session_id, asyncio.Event())
 
-    final_time = format_time(time.time() - start_time)
-    output += f"\n{'=' * 60}\n✅ **Debate Complete!** Total time: {final_time}\n{'=' * 60}\n"
 
-    yield output, final_time, score_display
+async def warm_up_client():
+    """Open pooled connections to Groq so the first debate skips the TLS handshakes"""
+    # Skipped if the pool was warmed recently enough that its connections are still alive
+    await warm_up_async(llm.client, WARMUP_CONNECTIONS, min_interval=KEEPALIVE_SECONDS)
+
+
+def upstream_error_message(error):
+    """Message shown when a debate has to stop because Groq kept failing"""
+    return (
+        f"⚠️ **Debate stopped:** couldn't get a reply from Groq "
+        f"({type(error).__name__}: {error}). Start the same debate again in a minute "
+        f"to pick up where it stopped - saved replies are reused."
+    )
 
 
 def format_time(seconds):
@@ -244,18 +609,13 @@ def format_time(seconds):
 # ============================================
 
 with gr.Blocks(title="AI Debate Chatroom") as demo:
-    gr.Markdown("""
-    # 🎭 AI Debate Chatroom
-    ### Watch 4 AI personalities debate any topic in real-time!
-
-    **The Bots:**
-    - 🔵 **TrollBot** - Chaos agent causing havoc
-    - 🟢 **LogicalBot** - Rational thinker pointing out fallacies
-    - 🟡 **EmpathyBot** - Emotionally intelligent and compassionate
-    - 🔴 **SkepticBot** - Sassy skeptic demanding evidence
-
-    ---
-    """)
+    gr.Markdown(
+        "# 🎭 AI Debate Chatroom\n"
+        f"### Watch {len(AI_PARTICIPANTS)} AI personalities debate any topic in real-time!\n\n"
+        "**The Bots:**\n"
+        + "".join(f"- {ai['color']} **{ai['name']}** - {ai.get('tagline', '')}\n" for ai in AI_PARTICIPANTS)
+        + "\n---\n"
+    )
 
     with gr.Row():
         with gr.Column(scale=1):
@@ -282,7 +642,15 @@ with gr.Blocks(title="AI Debate Chatroom") as demo:
                 info="Each bot speaks once per round"
             )
 
-            run_button = gr.Button("▶️ Start Debate", variant="primary", size="lg")
+            simultaneous_checkbox = gr.Checkbox(
+                label="⚡ Simultaneous Rounds",
+                value=SIMULTANEOUS_ROUNDS,
+                info="All bots answer at once - faster, but they can't react to each other within a round"
+            )
+
+            with gr.Row():
+                run_button = gr.Button("▶️ Start Debate", variant="primary", size="lg")
+                stop_button = gr.Button("⏹️ Stop", variant="stop", size="lg")
 
             timer_display = gr.Textbox(
                 label="⏱️ Elapsed Time",
@@ -296,16 +664,26 @@ with gr.Blocks(title="AI Debate Chatroom") as demo:
             - Max 7 rounds per hour
             """)
 
+            with gr.Accordion("👀 Watch a Debate", open=False):
+                room_input = gr.Textbox(
+                    label="Room code",
+                    placeholder="Paste a room code (or just open a shared link)",
+                    info="No password needed - watching costs nothing"
+                )
+                watch_button = gr.Button("👀 Watch")
+
         with gr.Column(scale=2):
-            output_display = gr.Textbox(
+            # Each bot's turn is its own message; updates only send what's new
+            output_display = gr.Chatbot(
                 label="📺 Live Debate Output",
-                lines=25,
-                max_lines=25,
-                interactive=False
+                height=600,
+                group_consecutive_messages=False,
+                feedback_options=None,
+                placeholder="Start a debate or open a shared link to watch one"
             )
 
             score_display = gr.Textbox(
-                label="🏆 Final Scores",
+                label="🏆 Live Standings",
                 lines=5,
                 interactive=False
             )
@@ -315,10 +693,37 @@ with gr.Blocks(title="AI Debate Chatroom") as demo:
 
     run_button.click(
         fn=run_debate_with_gui,
-        inputs=[topic_input, rounds_slider, password_input, session_state],
-        outputs=[output_display, timer_display, score_display]
+        inputs=[topic_input, rounds_slider, password_input, session_state, simultaneous_checkbox],
+        outputs=[output_display, timer_display, score_display],
+        # The scheduler decides which debates run; the rest show their place in line
+        concurrency_limit=MAX_CONCURRENT_DEBATES + MAX_QUEUED_DEBATES
     )
 
+    # Spectators: from the Watch button, or straight away when the page was opened from a shared link
+    watch_event = watch_button.click(
+        fn=watch_debate,
+        inputs=[room_input],
+        outputs=[output_display, timer_display, score_display],
+        concurrency_limit=MAX_SPECTATORS
+    )
+    link_event = demo.load(fn=room_from_url, outputs=[room_input], show_progress="hidden").then(
+        fn=watch_debate,
+        inputs=[room_input],
+        outputs=[output_display, timer_display, score_display],
+        concurrency_limit=MAX_SPECTATORS
+    )
+
+    # Stopping must never wait behind the debates it's meant to stop (it also stops watching)
+    stop_button.click(fn=stop_debate, concurrency_limit=None, show_progress="hidden",
+                      cancels=[watch_event, link_event])
+
+    # A closed or reloaded tab cancels its debate instead of leaving it calling Groq
+    demo.unload(stop_debate)
+
+    # Warm the connection pool as soon as the app is opened, before the first click.
+    # This runs on the server's event loop, which is where the pooled connections live.
+    demo.load(fn=warm_up_client, show_progress="hidden")
+
     gr.Markdown("""
     ---
     ### 🔒 Security Features:
@@ -339,12 +744,23 @@ with gr.Blocks(title="AI Debate Chatroom") as demo:
 # ============================================
 
 if __name__ == "__main__":
+    if not API_KEY:
+        raise ValueError("ERROR: GROQ_API_KEY environment variable not set! See instructions in comments.")
+
     print("\n" + "=" * 60)
     print("🎭 AI DEBATE CHATROOM - Starting GUI...")
     print("=" * 60)
     print(f"Password: {PASSWORD}")
     print("=" * 60 + "\n")
 
+    # Forget idle sessions in the background so memory stays bounded
+    session_limiter.start_eviction_thread()
+
+    # Prometheus metrics next to the app
+    if ENABLE_METRICS_ENDPOINT:
+        metrics.start_http_server(METRICS_PORT)
+        print(f"📊 Metrics at http://localhost:{METRICS_PORT}/metrics\n")
+
     # Launch with share=True to get a public 72-hour link
     # Change to share=False for local-only access
     demo.launch(
@@ -1,121 +1,187 @@
-from groq import Groq
-import time
+import asyncio
 import random
 import os
+from debate_engine import Debate, DebateLLM
+from length_governor import LengthPolicy
+from model_router import ModelRouter
+from personas import load_personas
+from debate_metrics import DebateMetrics
+from debate_pacing import Pacer
+from groq_client import get_async_client
+from resilient_calls import CircuitBreaker, ResilientCaller
+from response_cache import ResponseCache
+from transcript_store import TranscriptStore
 
 # ============================================
 # CONFIGURATION - Edit these settings
 # ============================================
 
 # Your Groq API key (get from: https://console.groq.com/keys)
+# (checked when the first request is made, so this file can be imported without it)
 API_KEY = os.getenv("GROQ_API_KEY")
-if not API_KEY:
-    raise ValueError("ERROR: GROQ_API_KEY environment variable not set!")
+
 # The debate topic/question
 DEBATE_TOPIC = "If all four of you were roommates, which one would get kicked out first and why?"
 
 # Number of back-and-forth exchanges
 NUM_ROUNDS = 3
 
-# AI participants and their assigned viewpoints
-AI_PARTICIPANTS = [
-    {
-        "name": "TrollBot",
-        "personality": "You are a chaos agent whose goal is to derail the conversation and cause havoc. You make absurd arguments, deliberately misinterpret others, bring up completely irrelevant points, and generally be a persistent nuisance. You're not mean-spirited, just annoying and chaotic.",
-        "color": "\033[94m"  # Blue
-    },
-    {
-        "name": "LogicalBot",
-        "personality": "You are a logical thinker who values consistency and rational arguments. You often point out logical fallacies and contradictions in others' arguments.",
-        "color": "\033[92m"  # Green
-    },
-    {
-        "name": "EmpathyBot",
-        "personality": "You are deeply empathetic and focus on emotional intelligence and personal experiences. You value compassion and understanding above strict logic.",
-        "color": "\033[93m"  # Yellow
-    },
-    {
-        "name": "SkepticBot",
-        "personality": "You are a skeptic who questions everything and plays devil's advocate. You challenge assumptions, demand evidence, and aren't easily convinced by emotional or logical arguments alone. You tend to reply in a sassy tone to ideas you reject as fact.",
-        "color": "\033[91m"  # Red
-    }
-]
+# Print each reply token-by-token as it arrives (False = wait for the full reply)
+STREAM_RESPONSES = True
+
+# Small delay after each turn so you can read along (optional since Groq is so fast!).
+# The debate keeps generating in the background while you read; set both to
+# 0 / None to print everything as soon as it's ready.
+TURN_PAUSE_SECONDS = 0.5
+READING_WORDS_PER_SECOND = None  # e.g. 6 to also slow streamed text to reading speed
+
+# Model settings
+# Using llama-3.3-70b-versatile - one of Groq's best models for reasoning
+MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.8  # Makes responses more creative and varied
+MAX_TOKENS = 1024
+
+# Model routing: early rounds use a fast small model and the closing statements
+# the big one. Lists are in order of preference - if a model gets rate limited,
+# keeps erroring or is slower than SLOW_MODEL_SECONDS (SLOW_FIRST_TOKEN_SECONDS
+# to the first token when streaming), the next one takes over.
+# Add a bot's name (or "TrollBot:final") as a key to route just that bot.
+MODEL_ROUTING = True
+MODEL_ROUTES = {
+    "default": ["llama-3.1-8b-instant", MODEL],
+    "final": [MODEL, "llama-3.1-8b-instant"],
+    "summary": ["llama-3.1-8b-instant", MODEL],
+}
+SLOW_MODEL_SECONDS = 4.0        # Full (non-streamed) replies and summaries
+SLOW_FIRST_TOKEN_SECONDS = 1.5  # Streamed replies, judged on time to first token
+
+# Reply length: the bots are asked for 2-3 sentences, so each turn gets a tight
+# token budget instead of MAX_TOKENS. A reply stops if the bot starts writing
+# another bot's turn ("TrollBot: ..."), and a streamed reply is cut off as soon
+# as it has MAX_SENTENCES sentences, so we don't wait for (or pay for) the rest.
+REPLY_MAX_TOKENS = 160
+FINAL_REPLY_MAX_TOKENS = 220  # Closing statements get a bit more room
+MAX_SENTENCES = 3
+STOP_AT_OTHER_SPEAKERS = True
+
+# Response cache: identical prompts are answered from memory / a local SQLite
+# file instead of calling Groq again. CACHE_REPLAY=True never expires entries and
+# fixes the speaking order per topic, so re-running a debate replays it exactly.
+CACHE_ENABLED = True
+CACHE_DB_PATH = "response_cache.sqlite3"
+CACHE_TTL_SECONDS = 7 * 24 * 3600  # One week
+CACHE_MAX_MEMORY_ENTRIES = 512
+CACHE_MAX_DB_ENTRIES = 10000
+CACHE_REPLAY = False
+
+# Every turn is saved to transcripts/<id>.jsonl as soon as it's made. If the
+# script crashes (or Groq goes down) mid-debate, running it again with the same
+# settings picks up from the last saved turn instead of starting over.
+TRANSCRIPT_DIR = "transcripts"
+RESUME_INTERRUPTED = True
+
+# Resilience: retries with backoff for 429s / 5xx / dropped connections,
+# a timeout per call, and a circuit breaker that stops hammering Groq when it's down
+GROQ_TIMEOUT_SECONDS = 30
+GROQ_MAX_RETRIES = 4
+HEDGE_REQUESTS = False  # True = send a backup request when a call is unusually slow
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30
+
+# Simultaneous rounds: every bot answers the same snapshot of the debate at once
+# (much faster, but bots can't react to each other within a round)
+SIMULTANEOUS_ROUNDS = False
+
+# Context window: bots see the last CONTEXT_RECENT_TURNS turns word-for-word
+# plus a rolling summary of older turns, all kept under CONTEXT_TOKEN_BUDGET tokens.
+# Each bot also sees up to CONTEXT_MENTION_TURNS older turns that mention it by name,
+# so even in a big panel it can answer what was said about it.
+CONTEXT_RECENT_TURNS = 8
+CONTEXT_TOKEN_BUDGET = 1500
+SUMMARY_MAX_TOKENS = 200
+CONTEXT_MENTION_TURNS = 3
+# Append-only prompts: each bot gets the debate as one chat message per turn after a
+# system prompt that never changes, so every prompt starts with the bot's previous
+# one and Groq can reuse that prefix from its prompt cache instead of reading it again
+APPEND_ONLY_PROMPTS = True
+
+# The bots are read from this file - use "personas_large_panel.json" for 12 of them
+PERSONAS_FILE = "personas.json"
 
 # ============================================
 # MAIN SCRIPT
 # ============================================
 
-# Initialize the Groq client with your API key
-client = Groq(api_key=API_KEY)
-
-# Reset color code (for terminal output)
-RESET_COLOR = "\033[0m"
-
-# Store the conversation history for each AI
-# This helps each AI remember what has been said
-conversation_histories = {ai["name"]: [] for ai in AI_PARTICIPANTS}
+# The bots' personas come from PERSONAS_FILE; their prompts live in debate_engine.py, shared with the GUI
+AI_PARTICIPANTS = [dict(p, color=p["ansi"]) for p in load_personas(PERSONAS_FILE)]
 
 
-def get_ai_response(ai_participant, conversation_context, is_final_round=False):
+def make_client():
     """
-    This function sends a prompt to Groq and gets a response.
+    Create the Groq client with your API key.
 
-    Parameters:
-    - ai_participant: Dictionary with AI's name and personality
-    - conversation_context: String containing the full conversation so far
-
-    Returns:
-    - The AI's response as a string
+    The connection pool has room for every bot at once (for simultaneous rounds)
+    plus a spare for a hedged request, and keeps connections alive between turns.
     """
+    if not API_KEY:
+        raise ValueError("ERROR: GROQ_API_KEY environment variable not set!")
+    return get_async_client(
+        API_KEY,
+        pool_size=len(AI_PARTICIPANTS) + 1,
+        timeout=GROQ_TIMEOUT_SECONDS,
+    )
 
-    # Build the system prompt that defines this AI's personality and role
-    system_prompt = f"""{ai_participant['personality']}
-
-You are {ai_participant['name']} in a debate about: "{DEBATE_TOPIC}"
-
-CRITICAL RULES:
-- When talking about yourself, use "I", "me", "my" - NEVER use your own name ({ai_participant['name']})
-- When addressing others, use their exact names: TrollBot, LogicalBot, EmpathyBot, SkepticBot
-- NEVER describe your approach (no "as a utilitarian", "from my perspective", etc.)
-- Just make your argument directly and confidently
-- No other participants exist
-
-DEBATE STYLE:
-- Be direct and assertive - state your position clearly
-- Challenge others specifically by name
-- 2-3 punchy sentences maximum
-- No hedging, no apologizing, no over-explaining
-- If you disagree, say why and move on
-- Sound like a real person arguing their point, not a bot following a script
-"""
-
-    # Build the user message with full conversation context
-    user_message = f"""Here's the conversation so far:
-
-{conversation_context}
-
-Now it's your turn to respond. What's your take?"""
-
-    # Call the Groq API to get a response
-    # Using llama-3.3-70b-versatile - one of Groq's best models for reasoning
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": system_prompt
-            },
-            {
-                "role": "user",
-                "content": user_message
-            }
-        ],
-        model="llama-3.3-70b-versatile",  # Fast and intelligent model
-        temperature=0.8,  # Makes responses more creative and varied
-        max_tokens=1024,
+
+# Wraps every Groq call with retries, backoff and a circuit breaker
+groq_caller = ResilientCaller(
+    max_retries=GROQ_MAX_RETRIES,
+    timeout=GROQ_TIMEOUT_SECONDS,
+    hedge=HEDGE_REQUESTS,
+    breaker=CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS),
+)
+
+# Set up the response cache (None when caching is turned off)
+response_cache = None
+if CACHE_ENABLED:
+    response_cache = ResponseCache(
+        db_path=CACHE_DB_PATH,
+        max_memory_entries=CACHE_MAX_MEMORY_ENTRIES,
+        max_db_entries=CACHE_MAX_DB_ENTRIES,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        replay=CACHE_REPLAY,
     )
 
-    # Extract the text from the response
-    return chat_completion.choices[0].message.content
+# Times every Groq call (latency, time to first token, tokens) per bot and round
+metrics = DebateMetrics()
+metrics.add_gauge("llm_retries", "Groq calls retried after an error", lambda: groq_caller.retries)
+
+# Sends the bots' requests to Groq (the client is only created on the first call)
+llm = DebateLLM(
+    make_client,
+    groq_caller,
+    max_concurrent_calls=len(AI_PARTICIPANTS) + 1,
+    cache=response_cache,
+    model=MODEL,
+    temperature=TEMPERATURE,
+    max_tokens=MAX_TOKENS,
+    metrics=metrics,
+    router=ModelRouter(MODEL_ROUTES, slow_seconds=SLOW_MODEL_SECONDS,
+                       slow_first_token_seconds=SLOW_FIRST_TOKEN_SECONDS) if MODEL_ROUTING else None,
+)
+
+# How long each bot's turn may get
+length_policy = LengthPolicy(
+    reply_tokens=REPLY_MAX_TOKENS,
+    final_reply_tokens=FINAL_REPLY_MAX_TOKENS,
+    max_sentences=MAX_SENTENCES,
+    stop_at_other_speakers=STOP_AT_OTHER_SPEAKERS,
+)
+
+# Append-only per-turn transcripts (used to resume interrupted debates)
+transcript_store = TranscriptStore(TRANSCRIPT_DIR)
+
+# Reset color code (for terminal output)
+RESET_COLOR = "\033[0m"
 
 
 def print_colored(text, color):
@@ -123,7 +189,7 @@ def print_colored(text, color):
     print(f"{color}{text}{RESET_COLOR}")
 
 
-def run_debate():
+async def run_debate():
     """Main function that runs the AI debate"""
 
     print("\n" + "=" * 60)
@@ -131,66 +197,94 @@ def run_debate():
     print(f"Topic: {DEBATE_TOPIC}")
     print("=" * 60 + "\n")
 
-    # Store the full conversation as a string
-    # Initialize with the participants list and topic
-    full_conversation = (
-        "DEBATE PARTICIPANTS: TrollBot, LogicalBot, EmpathyBot, SkepticBot.\n"
-        "No other participants exist.\n\n"
-        f"DEBATE TOPIC: {DEBATE_TOPIC}\n\n"
+    # Saved turn by turn; picks up an interrupted run of this same debate
+    transcript = await asyncio.to_thread(transcript_store.open, DEBATE_TOPIC, NUM_ROUNDS, AI_PARTICIPANTS,
+                                         SIMULTANEOUS_ROUNDS, resume=RESUME_INTERRUPTED)
+    if transcript.resumed:
+        print_colored(f"♻️  Resuming an interrupted debate - reusing {transcript.saved_turns} saved replies\n", "\033[95m")
+
+    # The debate loop itself lives in debate_engine.py. It keeps what the bots
+    # see (recent turns + a summary of older ones), shuffles the speakers each
+    # round and scores each message as it comes in - we just print its events.
+    debate = Debate(
+        DEBATE_TOPIC,
+        NUM_ROUNDS,
+        llm,
+        participants=AI_PARTICIPANTS,
+        simultaneous=SIMULTANEOUS_ROUNDS,
+        stream=STREAM_RESPONSES,
+        # In replay mode the speaking order is seeded from the topic so cached
+        # replies line up with the same prompts every run
+        rng=random.Random(DEBATE_TOPIC) if CACHE_REPLAY else None,
+        transcript=transcript,
+        recent_turns=CONTEXT_RECENT_TURNS,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        summary_max_tokens=SUMMARY_MAX_TOKENS,
+        length_policy=length_policy,
+        mention_turns=CONTEXT_MENTION_TURNS,
+        append_only_prompts=APPEND_ONLY_PROMPTS,
     )
 
-    # Run the debate for the specified number of rounds
-    for round_num in range(NUM_ROUNDS):
-        is_final_round = (round_num == NUM_ROUNDS - 1)
+    # Store the full conversation as a string (for the transcript file)
+    full_conversation = debate.header
 
-        if is_final_round:
-            print(f"\n--- FINAL ROUND: Closing Statements ---\n")
-        else:
-            print(f"\n--- Round {round_num + 1} ---\n")
+    # Turns are generated ahead into a buffer and printed at reading pace
+    pacer = Pacer(0 if SIMULTANEOUS_ROUNDS else TURN_PAUSE_SECONDS, READING_WORDS_PER_SECOND)
 
-        # Randomize the order of speakers for this round
-        round_order = AI_PARTICIPANTS.copy()
-        random.shuffle(round_order)
+    try:
+        async for event in pacer.replay(debate.run()):
+            ai = event.get("participant")
 
-        # Each AI gets a turn to speak in random order
-        for ai in round_order:
-            # Get this AI's response
-            response = get_ai_response(ai, full_conversation, is_final_round)
+            if event["type"] == "round":
+                if event["final"]:
+                    print(f"\n--- FINAL ROUND: Closing Statements ---\n")
+                else:
+                    print(f"\n--- Round {event['round'] + 1} ---\n")
 
-            # Format the message
-            message = f"{ai['name']}: {response}"
+            elif event["type"] == "speaking" and STREAM_RESPONSES:
+                # Print the reply piece by piece as it streams in
+                print(f"{ai['color']}{ai['name']}: ", end="", flush=True)
 
-            # Print it with color
-            print_colored(message, ai['color'])
-            print()  # Empty line for readability
+            elif event["type"] == "chunk":
+                print(event["delta"], end="", flush=True)
 
-            # Add to the full conversation history (APPEND, don't replace!)
-            full_conversation += message + "\n\n"
+            elif event["type"] == "turn":
+                if STREAM_RESPONSES and not SIMULTANEOUS_ROUNDS and not event["saved"]:
+                    print(RESET_COLOR)  # Already printed while streaming
+                else:
+                    print_colored(f"{ai['name']}: {event['text']}", ai['color'])
+                print()  # Empty line for readability
 
-            # Small delay so you can read along (optional since Groq is so fast!)
-            time.sleep(0.5)
+                # Add to the full conversation history (APPEND, don't replace!)
+                full_conversation += f"{ai['name']}: {event['text']}\n\n"
+    finally:
+        # If the debate crashed, its saved turns stay resumable
+        transcript.close()
 
     # Calculate debate scores based on mentions and engagement
     print("\n" + "=" * 60)
     print_colored("🏆 DEBATE SCORING 🏆", "\033[95m")
     print("=" * 60 + "\n")
 
-    scores = {}
-    for ai in AI_PARTICIPANTS:
-        # Count how many times other bots mentioned this bot's name
-        mentions = full_conversation.count(ai['name']) - NUM_ROUNDS  # Subtract their own messages
-
-        # Simple scoring: mentions indicate engagement/relevance
-        scores[ai['name']] = max(0, mentions)
-
-    # Sort by score
-    sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    # Simple scoring: each time another bot mentions you by name = 1 engagement point
+    sorted_scores = debate.scorer.standings()
 
     for rank, (name, score) in enumerate(sorted_scores, 1):
         medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
         ai_color = next(ai['color'] for ai in AI_PARTICIPANTS if ai['name'] == name)
         print_colored(f"{medal} #{rank} - {name}: {score} engagement points", ai_color)
 
+    # Who called out whom (and how often)
+    mention_graph = debate.scorer.format_mentions()
+    if mention_graph:
+        print("\nWho called out whom:")
+        print(mention_graph, end="")
+
+    # Where the time went: per-bot latency, time to first token and tokens
+    call_metrics = metrics.summary()
+    print("\nGroq call metrics:")
+    print(call_metrics, end="")
+
     print()
 
     # Save the conversation to a text file
@@ -202,6 +296,13 @@ def run_debate():
         for rank, (name, score) in enumerate(sorted_scores, 1):
             medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
             f.write(f"{medal} #{rank} - {name}: {score} engagement points\n")
+        if mention_graph:
+            f.write("\nWHO CALLED OUT WHOM\n")
+            f.write(mention_graph)
+        f.write("\n" + "=" * 60 + "\n")
+        f.write("CALL METRICS\n")
+        f.write("=" * 60 + "\n")
+        f.write(call_metrics)
 
     print("\n" + "=" * 60)
     print_colored("💾 Debate saved to 'ai_debate_transcript.txt'", "\033[95m")
@@ -214,4 +315,4 @@ def run_debate():
 
 if __name__ == "__main__":
     # This block only runs if you execute this file directly
-    run_debate()
\ No newline at end of file
+    asyncio.run(run_debate())
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from debate_engine import DEFAULT_MODEL, DEFAULT_PARTICIPANTS, DebateLLM, run_headless_debate
+from groq_client import get_async_client
+from length_governor import LengthPolicy
+from personas import load_personas
+from rate_limiter import UpstreamLimiter
+from resilient_calls import ResilientCaller
+from response_cache import ResponseCache
+
+# ============================================
+# BATCH DEBATE RUNNER
+# ============================================
+# Runs many debates in parallel with no UI and writes one JSONL record per
+# debate as soon as it finishes.
+#
+# Usage:
+#   python batch_debates.py topics.txt -o debates.jsonl --workers 8
+#
+# The input file is either plain text (one topic per line) or JSONL where
+# each line looks like:
+#   {"topic": "Is a hot dog a sandwich?", "rounds": 2, "participants": ["TrollBot", "LogicalBot"]}
+# "rounds" and "participants" are optional. "participants" may list bot names
+# from the personas file (--personas) or full {"name": ..., "personality": ...} personas.
+
+
+def load_jobs(path, default_rounds, panel=DEFAULT_PARTICIPANTS):
+    """Read debate jobs from a .txt (one topic per line) or .jsonl file"""
+    personas = {p["name"]: p for p in panel}
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            if not line.startswith("{"):
+                jobs.append({"topic": line, "rounds": default_rounds, "participants": panel})
+                continue
+
+            job = json.loads(line)
+            if "topic" not in job:
+                raise ValueError(f"{path}:{line_num}: missing 'topic'")
+
+            participants = []
+            for persona in job.get("participants") or panel:
+                if isinstance(persona, str):
+                    if persona not in personas:
+                        raise ValueError(f"{path}:{line_num}: unknown participant '{persona}'")
+                    persona = personas[persona]
+                participants.append(persona)
+
+            jobs.append({
+                "topic": job["topic"],
+                "rounds": int(job.get("rounds", default_rounds)),
+                "participants": participants,
+            })
+    return jobs
+
+
+async def run_batch(jobs, output_path, llm, workers, simultaneous=False, length_policy=None,
+                    append_only_prompts=False):
+    """Run every job with at most `workers` debates at once, appending results to output_path"""
+    queue = asyncio.Queue()
+    for index, job in enumerate(jobs):
+        queue.put_nowait((index, job))
+
+    done = 0
+    failed = 0
+    start = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def worker():
+            nonlocal done, failed
+            while True:
+                try:
+                    index, job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                try:
+                    record = await run_headless_debate(
+                        job["topic"],
+                        job["rounds"],
+                        llm,
+                        participants=job["participants"],
+                        simultaneous=simultaneous,
+                        length_policy=length_policy,
+                        append_only_prompts=append_only_prompts,
+                    )
+                except Exception as error:
+                    failed += 1
+                    record = {
+                        "topic": job["topic"],
+                        "rounds": job["rounds"],
+                        "error": f"{type(error).__name__}: {error}",
+                    }
+                record["job"] = index
+
+                # One line per debate, flushed right away so a crash loses nothing finished
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+                done += 1
+                per_minute = done / max(time.monotonic() - start, 1e-9) * 60
+                status = "FAILED" if "error" in record else f"{record['duration']:.1f}s"
+                print(f"[{done}/{len(jobs)}] {status} - {job['topic'][:60]} ({per_minute:.1f} debates/min)",
+                      file=sys.stderr)
+
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(jobs)))))
+
+    elapsed = time.monotonic() - start
+    return {"debates": done, "failed": failed, "seconds": round(elapsed, 1),
+            "debates_per_minute": round(done / max(elapsed, 1e-9) * 60, 2)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run many AI debates in parallel and save them as JSONL.")
+    parser.add_argument("topics", help="Topics file: .txt (one per line) or .jsonl")
+    parser.add_argument("-o", "--output", default="debates.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per debate when the job doesn't say")
+    parser.add_argument("--workers", type=int, default=8, help="Debates running at the same time")
+    parser.add_argument("--max-llm-calls", type=int, default=16, help="Groq calls in flight at once")
+    parser.add_argument("--rpm", type=int, default=1000, help="Global Groq requests per minute")
+    parser.add_argument("--tpm", type=int, default=300000, help="Global Groq tokens per minute")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--personas", default="personas.json", help="Personas file for the default panel")
+    parser.add_argument("--simultaneous", action="store_true", help="All bots answer each round at once")
+    parser.add_argument("--cache", action="store_true", help="Reuse cached replies (off by default for datasets)")
+    parser.add_argument("--reply-tokens", type=int, default=160, help="Token budget per bot turn")
+    parser.add_argument("--max-sentences", type=int, default=3, help="Cut replies off after this many sentences")
+    parser.add_argument("--append-only-prompts", action="store_true",
+                        help="Send each debate as a growing chat so Groq's prompt cache can reuse it")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise SystemExit("ERROR: GROQ_API_KEY environment variable not set!")
+
+    jobs = load_jobs(args.topics, args.rounds, load_personas(args.personas))
+    llm = DebateLLM(
+        get_async_client(api_key, pool_size=args.max_llm_calls),
+        ResilientCaller(),
+        upstream_limiter=UpstreamLimiter(args.rpm, args.tpm),
+        max_concurrent_calls=args.max_llm_calls,
+        cache=ResponseCache() if args.cache else None,
+        model=args.model,
+    )
+
+    print(f"Running {len(jobs)} debates with {args.workers} workers -> {args.output}", file=sys.stderr)
+    length_policy = LengthPolicy(reply_tokens=args.reply_tokens, max_sentences=args.max_sentences)
+    summary = asyncio.run(run_batch(jobs, args.output, llm, args.workers, args.simultaneous, length_policy,
+                                    args.append_only_prompts))
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
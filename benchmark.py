@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mock_groq_server import MockGroqServer
+from rate_limiter import SessionRateLimiter
+
+# ============================================
+# OFFLINE BENCHMARK
+# ============================================
+# Runs real debates against the local mock Groq server (no API quota used)
+# and reports:
+#   - time to first token (TTFT) per turn
+#   - per-turn latency percentiles
+#   - debates per minute with N concurrent sessions (finished debates only;
+#     debates that were refused, failed or stopped are reported separately)
+#   - prompt tokens sent, and how many the mock's prompt cache could reuse
+#   - peak memory
+#
+# Usage:
+#   python benchmark.py --target gui --sessions 20 --rounds 3
+#   python benchmark.py --target terminal --debates 3
+#   python benchmark.py --target batch --sessions 50
+#   python benchmark.py --target gui --prompts flat --prompt-rate 2000   (compare with --prompts append-only)
+#   python benchmark.py --target gui --no-stream                         (compare with --stream)
+#
+# Gate a deploy on regressions (exits with code 1 if a limit is broken):
+#   python benchmark.py --target gui --max-ttft-p95 0.5 --min-debates-per-minute 30 --json bench.json
+
+TOPIC = "If all four of you were roommates, which one would get kicked out first and why?"
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(len(ordered) * pct / 100 + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class TurnStats:
+    """Collects TTFT and full-turn latency for every bot turn (a non-streamed reply's first token is the whole reply)"""
+
+    def __init__(self):
+        self.ttft = []
+        self.turns = []
+
+    def wrap_llm(self, llm):
+        """Time the bots' calls on a DebateLLM (context summaries aren't turns, so they're skipped)"""
+        stream_fn = llm.stream
+        complete_fn = llm.complete
+
+        async def stream(messages, persona=None, *args, **kwargs):
+            start = time.perf_counter()
+            first = True
+            async for chunk in stream_fn(messages, persona, *args, **kwargs):
+                if first and persona:
+                    self.ttft.append(time.perf_counter() - start)
+                    first = False
+                yield chunk
+            if persona:
+                self.turns.append(time.perf_counter() - start)
+
+        async def complete(messages, persona=None, *args, **kwargs):
+            start = time.perf_counter()
+            result = await complete_fn(messages, persona, *args, **kwargs)
+            if persona:
+                self.ttft.append(time.perf_counter() - start)
+                self.turns.append(time.perf_counter() - start)
+            return result
+
+        llm.stream = stream
+        llm.complete = complete
+        return llm
+
+
+def load_script(name, filename):
+    """Import one of the debate scripts by file path (the terminal one has spaces in its name)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Measure the real work, not cache hits or resumed transcripts from earlier runs
+    module.llm.cache = None
+    module.RESUME_INTERRUPTED = False
+    return module
+
+
+async def bench_gui(args, stats, gui):
+    """Returns (finished debates, failed debates)"""
+    stats.wrap_llm(gui.llm)
+    if args.prompts:
+        gui.APPEND_ONLY_PROMPTS = args.prompts == "append-only"
+    if args.stream is not None:
+        gui.STREAM_RESPONSES = args.stream
+    # Every session debates the same topic - make each one a real debate, not a spectator
+    gui.JOIN_LIVE_DEBATES = False
+    # Per-visitor limits would turn benchmark sessions away (and count as "fast" debates)
+    gui.session_limiter = SessionRateLimiter(max_debates=1, max_rounds=args.rounds)
+
+    async def session(index):
+        frame = None
+        debate = gui.run_debate_with_gui(
+            TOPIC, args.rounds, gui.PASSWORD, f"bench-{index}",
+            args.simultaneous, progress=lambda *a, **k: None,
+        )
+        async for frame in debate:
+            pass
+        # Only a debate that got to its scoring counts - not a refusal, error or stop
+        return bool(frame and frame[0] and frame[0][-1]["content"].startswith("✅ **Debate Complete!**"))
+
+    finished = await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    return sum(finished), args.sessions - sum(finished)
+
+
+async def bench_terminal(args, stats, terminal):
+    """Returns (finished debates, failed debates)"""
+    terminal.NUM_ROUNDS = args.rounds
+    terminal.SIMULTANEOUS_ROUNDS = args.simultaneous
+    if args.prompts:
+        terminal.APPEND_ONLY_PROMPTS = args.prompts == "append-only"
+    if args.stream is not None:
+        terminal.STREAM_RESPONSES = args.stream
+    stats.wrap_llm(terminal.llm)
+
+    # The terminal runner prints everything - keep the report readable
+    failed = 0
+    for _ in range(args.debates):
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                await terminal.run_debate()
+        except Exception as error:
+            failed += 1
+            print(f"Debate failed: {type(error).__name__}: {error}", file=sys.stderr)
+    return args.debates - failed, failed
+
+
+async def bench_batch(args, stats, base_url):
+    """Returns (finished debates, failed debates)"""
+    from debate_engine import DebateLLM, run_headless_debate
+    from groq_client import get_async_client
+    from resilient_calls import ResilientCaller
+
+    llm = DebateLLM(
+        get_async_client("mock-key", pool_size=args.sessions * 4, base_url=base_url),
+        ResilientCaller(),
+        max_concurrent_calls=args.sessions * 4,
+    )
+    stats.wrap_llm(llm)
+    results = await asyncio.gather(*(
+        run_headless_debate(TOPIC, args.rounds, llm, simultaneous=args.simultaneous,
+                            append_only_prompts=args.prompts == "append-only", stream=bool(args.stream))
+        for _ in range(args.sessions)
+    ), return_exceptions=True)
+    # A debate that gave up (retries exhausted, circuit open) is a failure, not a crash
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors:
+        print(f"Debate failed: {type(error).__name__}: {error}", file=sys.stderr)
+    return len(results) - len(errors), len(errors)
+
+
+def run_benchmark(args):
+    server = MockGroqServer(
+        latency=args.latency, token_rate=args.token_rate,
+        error_rate=args.error_rate, reply_tokens=args.reply_tokens, prompt_rate=args.prompt_rate,
+    ).start()
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    os.environ.setdefault("GROQ_API_KEY", "mock-key")
+
+    stats = TurnStats()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    # Scripts write transcripts / cache files to the working directory
+    original_cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="debate-bench-"))
+    try:
+        # Import before starting the clock - startup time isn't what we're measuring here
+        if args.target == "gui":
+            module = load_script("AI_Debate_GUI", "AI_Debate_GUI.py")
+        elif args.target == "terminal":
+            module = load_script("ai_vs_ai", "ai vs ai.py")
+        stream = args.stream
+        if stream is None:
+            stream = module.STREAM_RESPONSES if args.target != "batch" else False
+
+        start = time.perf_counter()
+        if args.target == "gui":
+            debates, failed = asyncio.run(bench_gui(args, stats, module))
+        elif args.target == "terminal":
+            debates, failed = asyncio.run(bench_terminal(args, stats, module))
+        else:
+            debates, failed = asyncio.run(bench_batch(args, stats, server.base_url))
+    finally:
+        os.chdir(original_cwd)
+        server.stop()
+    elapsed = time.perf_counter() - start
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    report = {
+        "target": args.target,
+        "sessions": args.sessions if args.target != "terminal" else 1,
+        "debates": debates,
+        "failed_debates": failed,
+        "rounds": args.rounds,
+        "simultaneous": args.simultaneous,
+        "stream": stream,
+        "seconds": round(elapsed, 2),
+        "debates_per_minute": round(debates / elapsed * 60, 2),
+        "turns": len(stats.turns),
+        "ttft_ms": {p: ms(percentile(stats.ttft, p)) for p in (50, 95, 99)},
+        "turn_latency_ms": {p: ms(percentile(stats.turns, p)) for p in (50, 95, 99)},
+        "mock_requests": server.settings.requests,
+        "mock_errors": server.settings.errors,
+        "prompt_tokens": server.settings.prompt_tokens,
+        "cached_prompt_tokens": server.settings.cached_prompt_tokens,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.tracemalloc:
+        report["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    return report
+
+
+def check_limits(report, args):
+    """Return a list of broken regression limits"""
+    failures = []
+    if report["failed_debates"] > args.max_failed_debates:
+        failures.append(f"{report['failed_debates']} debates failed > {args.max_failed_debates}")
+    ttft_p95 = report["ttft_ms"][95]
+    turn_p95 = report["turn_latency_ms"][95]
+    if args.max_ttft_p95 is not None and ttft_p95 is not None and ttft_p95 > args.max_ttft_p95 * 1000:
+        failures.append(f"TTFT p95 {ttft_p95}ms > {args.max_ttft_p95 * 1000:.0f}ms")
+    if args.max_turn_p95 is not None and turn_p95 is not None and turn_p95 > args.max_turn_p95 * 1000:
+        failures.append(f"turn p95 {turn_p95}ms > {args.max_turn_p95 * 1000:.0f}ms")
+    if args.min_debates_per_minute is not None and report["debates_per_minute"] < args.min_debates_per_minute:
+        failures.append(f"{report['debates_per_minute']} debates/min < {args.min_debates_per_minute}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the debates against a local mock Groq server.")
+    parser.add_argument("--target", choices=["gui", "terminal", "batch"], default="gui")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent debates (gui/batch)")
+    parser.add_argument("--debates", type=int, default=1, help="Debates to run one after another (terminal)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--simultaneous", action="store_true", help="Use simultaneous rounds")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Mock tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock fraction of failed requests")
+    parser.add_argument("--reply-tokens", type=int, default=45, help="Mock tokens per reply")
+    parser.add_argument("--prompt-rate", type=float, help="Mock uncached prompt tokens read per second (default: instantly)")
+    parser.add_argument("--prompts", choices=["flat", "append-only"],
+                        help="Prompt layout (default: the script's APPEND_ONLY_PROMPTS; flat for batch)")
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction,
+                        help="Stream the bots' replies (default: the script's STREAM_RESPONSES; off for batch)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also trace Python allocations (slower)")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--max-ttft-p95", type=float, help="Fail if TTFT p95 exceeds this many seconds")
+    parser.add_argument("--max-turn-p95", type=float, help="Fail if turn latency p95 exceeds this many seconds")
+    parser.add_argument("--min-debates-per-minute", type=float, help="Fail if throughput drops below this")
+    parser.add_argument("--max-failed-debates", type=int, default=0,
+                        help="Fail if more debates than this didn't finish (default: any)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_limits(report, args)
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
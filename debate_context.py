@@ -0,0 +1,211 @@
+import re
+from collections import defaultdict, deque
+
+# ============================================
+# BOUNDED DEBATE CONTEXT
+# ============================================
+# Shared by AI_Debate_GUI.py and "ai vs ai.py".
+# Instead of re-sending the whole transcript every turn, the bots see:
+#   - the debate header (participants + topic)
+#   - a rolling summary of older turns
+#   - the last few turns word-for-word
+# so prompt size stays flat no matter how long the debate runs.
+#
+# With names given, render(speaker) also adds the speaker's own thread: the
+# last few older turns that mention them by name, so they can answer what
+# was said about them. Everyone else's side conversations stay in the
+# summary, which keeps prompts flat as the panel grows too.
+#
+# With append_only=True the window is built for provider prefix caching
+# (see chat_history): it keeps growing to twice recent_turns or the token
+# budget, then drops back to half of recent_turns in one go. In between, each
+# prompt only adds turns to the end of the last one, so the provider can
+# reuse everything it already processed.
+
+# Rough token estimate - good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+SUMMARY_INSTRUCTIONS = """You keep a running summary of a debate.
+Merge the new turns into the existing summary.
+- Keep who argued what, by name, and who attacked whom
+- Keep it under {max_words} words
+- Plain sentences only, no headings or bullet points"""
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_message_tokens(messages):
+    """Estimate the prompt tokens of a list of chat messages"""
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def first_sentence(text):
+    """Return the first sentence of a turn (used as a cheap stand-in summary)"""
+    text = " ".join(text.split())
+    for i, ch in enumerate(text):
+        if ch in ".!?" and (i + 1 == len(text) or text[i + 1] == " "):
+            return text[:i + 1]
+    return text
+
+
+class DebateContext:
+    """Conversation context with a verbatim window plus a rolling summary"""
+
+    def __init__(self, header, recent_turns=8, token_budget=1500,
+                 summary_max_tokens=200, summary_batch_turns=4, names=(), mention_turns=3,
+                 append_only=False):
+        self.header = header
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_batch_turns = summary_batch_turns
+        self.mention_turns = mention_turns
+        self.append_only = append_only
+
+        self.summary = ""
+        self.recent = deque()         # (name, text) turns shown word-for-word
+        self.unsummarized = []        # turns pushed out of the window, not yet in the summary
+        self._recent_tokens = 0
+        self._pinned_summary = None   # Summary shown since the window was last compacted (append_only)
+
+        # name -> (turn number, speaker, text) of the latest turns mentioning that name
+        self.turn_count = 0
+        self.mentions = defaultdict(lambda: deque(maxlen=recent_turns + mention_turns))
+        self._name_pattern = None
+        if names:
+            alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+            self._name_pattern = re.compile(rf"\b({alternatives})\b")
+
+    def add_turn(self, name, text):
+        """Append a turn and push the oldest ones out of the verbatim window"""
+        line = self._format_turn(name, text)
+        self.recent.append((name, text))
+        self._recent_tokens += estimate_tokens(line)
+
+        if self._name_pattern:
+            for mentioned in set(self._name_pattern.findall(text)) - {name}:
+                self.mentions[mentioned].append((self.turn_count, name, text))
+        self.turn_count += 1
+
+        if self.append_only:
+            # Compact rarely and by a lot, so most prompts extend the previous one
+            if len(self.recent) > 2 * self.recent_turns or self._recent_tokens > self._window_budget():
+                while len(self.recent) > 1 and (
+                    len(self.recent) > self.recent_turns // 2
+                    or self._recent_tokens > self._window_budget() // 2
+                ):
+                    self._drop_oldest()
+                self._pinned_summary = None
+            return
+
+        # Keep at least the newest turn, even if it alone is over budget
+        while len(self.recent) > 1 and (
+            len(self.recent) > self.recent_turns
+            or self._recent_tokens > self._window_budget()
+        ):
+            self._drop_oldest()
+
+    def needs_summary(self):
+        """True once enough turns have left the window to fold into the summary"""
+        return len(self.unsummarized) >= self.summary_batch_turns
+
+    def build_summary_messages(self):
+        """Build the chat messages asking the model to update the summary"""
+        new_turns = "".join(self._format_turn(name, text) for name, text in self.unsummarized)
+        return [
+            {
+                "role": "system",
+                "content": SUMMARY_INSTRUCTIONS.format(max_words=self.summary_max_tokens * 3 // 4),
+            },
+            {
+                "role": "user",
+                "content": f"EXISTING SUMMARY:\n{self.summary or '(none yet)'}\n\nNEW TURNS:\n{new_turns}",
+            },
+        ]
+
+    def update_summary(self, summary):
+        """Replace the summary with one that covers every turn outside the window"""
+        self.summary = summary.strip()
+        self.unsummarized = []
+        self._pinned_summary = None
+
+    def render(self, speaker=None):
+        """Render the context string that gets sent to the bots (to `speaker`, if given)"""
+        parts = [self.header]
+
+        summary = self._summary_text()
+        if summary:
+            parts.append(f"SUMMARY OF EARLIER DEBATE:\n{summary}\n\n")
+
+        mentions = self._older_mentions(speaker, summary) if speaker else []
+        if mentions:
+            parts.append("EARLIER TURNS THAT MENTION YOU:\n")
+            parts.extend(self._format_turn(name, text) for name, text in mentions)
+
+        if summary or mentions:
+            parts.append("MOST RECENT TURNS:\n")
+
+        parts.extend(self._format_turn(name, text) for name, text in self.recent)
+        return "".join(parts)
+
+    def chat_history(self, speaker=None):
+        """
+        The context in pieces for append-only chat prompts: (background, turns, mentions).
+
+        `background` is the header plus the summary, `turns` the (name, text)
+        window and `mentions` the older turns about `speaker`. Until the window
+        is next compacted, background stays the same and turns only grow at
+        the end; mentions change every time, so they belong after the turns.
+        """
+        if self._pinned_summary is None:
+            self._pinned_summary = self._summary_text()
+        summary = self._pinned_summary
+
+        background = self.header
+        if summary:
+            background += f"SUMMARY OF EARLIER DEBATE:\n{summary}\n\n"
+        mentions = self._older_mentions(speaker, summary) if speaker else []
+        return background.rstrip(), list(self.recent), mentions
+
+    def _older_mentions(self, speaker, summary):
+        # Turns about the speaker that have left the verbatim window, newest first
+        # until mention_turns or the rest of the token budget is used up
+        first_recent = self.turn_count - len(self.recent)
+        budget = self.token_budget - estimate_tokens(self.header) - estimate_tokens(summary) - self._recent_tokens
+        picked = []
+        for turn, name, text in reversed(self.mentions.get(speaker, ())):
+            if len(picked) == self.mention_turns:
+                break
+            if turn >= first_recent:
+                continue
+            cost = estimate_tokens(self._format_turn(name, text))
+            if cost > budget:
+                break
+            budget -= cost
+            picked.append((name, text))
+        return picked[::-1]
+
+    def _summary_text(self):
+        # Turns waiting for the next summary update are shown as one-liners
+        pending = " ".join(f"{name}: {first_sentence(text)}" for name, text in self.unsummarized)
+        text = f"{self.summary} {pending}".strip()
+
+        max_chars = self.summary_max_tokens * CHARS_PER_TOKEN
+        if len(text) > max_chars:
+            text = "..." + text[-max_chars:]
+        return text
+
+    def _drop_oldest(self):
+        old_name, old_text = self.recent.popleft()
+        self._recent_tokens -= estimate_tokens(self._format_turn(old_name, old_text))
+        self.unsummarized.append((old_name, old_text))
+
+    def _window_budget(self):
+        return self.token_budget - estimate_tokens(self.header) - self.summary_max_tokens
+
+    @staticmethod
+    def _format_turn(name, text):
+        return f"{name}: {text}\n\n"
@@ -0,0 +1,642 @@
+import asyncio
+import random
+import time
+
+from debate_context import DebateContext, estimate_message_tokens, estimate_tokens
+from debate_scoring import DebateScorer
+from length_governor import LengthPolicy
+from personas import load_personas
+from resilient_calls import is_retryable
+from response_cache import make_cache_key
+
+# ============================================
+# DEBATE ENGINE (SHARED CORE)
+# ============================================
+# The prompts and the debate loop, shared by AI_Debate_GUI.py,
+# "ai vs ai.py" and the batch tools (the personas come from personas.json).
+# Nothing here talks
+# to a screen: a Debate yields plain event dicts and each front end decides
+# how to show them.
+#
+# Importing this module is cheap - groq/httpx are only loaded when the
+# first call is made, and no API key is needed until then.
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# The bots live in personas.json (see personas.py)
+DEFAULT_PARTICIPANTS = load_personas()
+
+FINAL_ROUND_INSTRUCTION = """
+
+FINAL ROUND - CONCLUDING STATEMENT:
+- This is your last chance to speak
+- Give your final opinion on the debate topic
+- You may acknowledge who made the strongest points (by name)
+- Wrap up your argument concisely
+"""
+
+
+def debate_header(participants, topic):
+    """The participants + topic block every conversation starts with"""
+    names = ", ".join(p["name"] for p in participants)
+    return (
+        f"DEBATE PARTICIPANTS: {names}.\n"
+        "No other participants exist.\n\n"
+        f"DEBATE TOPIC: {topic}\n\n"
+    )
+
+
+SYSTEM_PROMPT = """{personality}
+
+You are {name} in a debate about the given topic.
+
+CRITICAL RULES - DO NOT BREAK THESE:
+- The ONLY participants are: {names}
+- When talking about yourself, use "I", "me", "my" - NEVER use your own name ({name})
+- When addressing others, use their exact names ONLY
+- NEVER invent new participants, names, or people
+- If someone isn't in the list above, they don't exist in this debate
+- NEVER describe your approach (no "as a utilitarian", "from my perspective", etc.)
+- Just make your argument directly and confidently
+
+DEBATE STYLE:
+- Be direct and assertive - state your position clearly
+- Challenge others specifically by name
+- 2-3 punchy sentences maximum
+- No hedging, no apologizing, no over-explaining
+- If you disagree, say why and move on
+- Sound like a real person arguing their point, not a bot following a script{final_round_instruction}
+"""
+
+USER_PROMPT = """Here's the conversation so far:
+
+{conversation_context}
+
+Now it's your turn to respond. What's your take?"""
+
+# Append-only prompts end with this instead (see PanelPrompts.chat_messages)
+TURN_PROMPT = "Now it's your turn to respond. What's your take?"
+
+
+class PanelPrompts:
+    """Every persona's system prompt for one panel, rendered once instead of on every turn"""
+
+    def __init__(self, participants):
+        names = ", ".join(p["name"] for p in participants)
+        self._system = {}
+        for participant in participants:
+            for is_final_round in (False, True):
+                self._system[participant["name"], is_final_round] = SYSTEM_PROMPT.format(
+                    personality=participant["personality"],
+                    name=participant["name"],
+                    names=names,
+                    final_round_instruction=FINAL_ROUND_INSTRUCTION if is_final_round else "",
+                )
+
+    def messages(self, participant, conversation_context, is_final_round=False):
+        """The chat messages for a participant's turn"""
+        return [
+            {"role": "system", "content": self._system[participant["name"], is_final_round]},
+            {"role": "user", "content": USER_PROMPT.format(conversation_context=conversation_context)}
+        ]
+
+    def chat_messages(self, participant, background, turns, mentions=(), is_final_round=False):
+        """
+        The same turn as an append-only chat, for provider prefix caching.
+
+        One message per debate turn (the participant's own as "assistant"),
+        after a system prompt that never changes during the debate. Anything
+        that differs from call to call - the older turns mentioning them and
+        the final round instruction - goes in the last message, so this
+        prompt starts with the whole of the participant's previous one.
+        """
+        name = participant["name"]
+        messages = [
+            {"role": "system", "content": self._system[name, False]},
+            {"role": "user", "content": background},
+        ]
+        for speaker, text in turns:
+            if speaker == name:
+                messages.append({"role": "assistant", "content": text})
+            else:
+                messages.append({"role": "user", "content": f"{speaker}: {text}"})
+
+        closing = ""
+        if mentions:
+            closing = "EARLIER TURNS THAT MENTION YOU:\n"
+            closing += "".join(f"{speaker}: {text}\n\n" for speaker, text in mentions)
+        closing += TURN_PROMPT + (FINAL_ROUND_INSTRUCTION if is_final_round else "")
+        messages.append({"role": "user", "content": closing})
+        return messages
+
+
+def build_messages(participant, participants, conversation_context, is_final_round=False):
+    """Build the chat messages for one turn outside a Debate (a Debate keeps its PanelPrompts)"""
+    return PanelPrompts(participants).messages(participant, conversation_context, is_final_round)
+
+
+def cached_prompt_tokens(usage):
+    """Prompt tokens the provider reused from its prefix cache (0 when it doesn't say)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+class DebateLLM:
+    """Makes Groq calls for the engine: async client, retries, global limits, cache, metrics and model routing"""
+
+    def __init__(self, client, caller, upstream_limiter=None, max_concurrent_calls=16,
+                 cache=None, model=DEFAULT_MODEL, temperature=0.8, max_tokens=1024, metrics=None,
+                 router=None):
+        # `client` may also be a function that builds one, so groq isn't
+        # imported (and no API key is needed) until the first call
+        self._client = client
+        self.caller = caller
+        self.upstream_limiter = upstream_limiter
+        self.semaphore = asyncio.Semaphore(max_concurrent_calls)
+        self.cache = cache
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.metrics = metrics
+        self.router = router  # model_router.ModelRouter; None = always use `model`
+
+    @property
+    def client(self):
+        if callable(self._client):
+            self._client = self._client()
+        return self._client
+
+    def _start_timer(self, persona, round_num, model=None):
+        if self.metrics:
+            return self.metrics.start_call(persona or "summary", round_num + 1, model)
+        return None
+
+    def _candidates(self, persona, is_final_round):
+        if self.router:
+            return self.router.candidates(persona, is_final_round)
+        return [self.model]
+
+    def _choose(self, candidates, streaming=False):
+        return self.router.choose(candidates, streaming) if self.router else candidates[0]
+
+    async def _cached(self, persona, messages, candidates, temperature, max_tokens):
+        # Replies are cached under the model that wrote them; any candidate's will do
+        keys = {make_cache_key(persona, messages, model, temperature, max_tokens): model for model in candidates}
+        key, text = await self.cache.get_any_async(keys)
+        return text, keys.get(key)
+
+    def _record_failure(self, model, candidates, error):
+        if not self.router:
+            return
+        self.router.record_failure(model, error)
+        # Let the retry go straight to another model instead of waiting this one out
+        retryable = is_retryable(error) or getattr(error, "status_code", None) == 404
+        if retryable and self.router.has_alternative(model, candidates):
+            error.can_fall_back = True
+
+    async def complete(self, messages, persona=None, temperature=None, max_tokens=None, round_num=0, stop=None,
+                       is_final_round=False):
+        """
+        Get one completion.
+
+        Returns (text, usage) where usage has prompt_tokens, cached_prompt_tokens
+        (served from Groq's prompt cache), completion_tokens, latency (seconds),
+        cached (answered from our response cache) and model.
+        """
+        temperature = self.temperature if temperature is None else temperature
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        candidates = self._candidates(persona, is_final_round)
+        start = time.monotonic()
+
+        use_cache = bool(self.cache and persona)
+        if use_cache:
+            cached, cached_model = await self._cached(persona, messages, candidates, temperature, max_tokens)
+            if cached is not None:
+                usage = {"prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0,
+                         "cached": True, "model": cached_model}
+                return cached, usage
+
+        answered_by = []
+
+        async def request(attempt):
+            # Each attempt (including hedges) picks a model and takes its own budget, slot and timer
+            model = self._choose(candidates)
+            timer = self._start_timer(persona, round_num, model)
+            try:
+                if self.upstream_limiter:
+                    await self.upstream_limiter.acquire_async(estimate_message_tokens(messages))
+                async with self.semaphore:
+                    if timer:
+                        timer.started()
+                    attempt.sent()
+                    sent = time.monotonic()
+                    chat_completion = await self.client.chat.completions.create(
+                        messages=messages,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stop=stop,
+                    )
+            except Exception as error:
+                if timer:
+                    timer.fail(error)
+                self._record_failure(model, candidates, error)
+                raise
+            if self.router:
+                self.router.record_success(model, time.monotonic() - sent)
+            answered_by.append(model)
+            if timer:
+                usage = chat_completion.usage
+                timer.finish(usage.prompt_tokens if usage else estimate_message_tokens(messages),
+                             usage.completion_tokens if usage else 0,
+                             cached_prompt_tokens(usage))
+            return chat_completion
+
+        chat_completion = await self.caller.call_async(request)
+        text = chat_completion.choices[0].message.content
+
+        if chat_completion.usage:
+            prompt_tokens = chat_completion.usage.prompt_tokens
+            completion_tokens = chat_completion.usage.completion_tokens
+        else:
+            prompt_tokens = estimate_message_tokens(messages)
+            completion_tokens = estimate_tokens(text)
+        reused_tokens = cached_prompt_tokens(chat_completion.usage)
+        if self.upstream_limiter:
+            self.upstream_limiter.consume(completion_tokens)
+
+        if use_cache:
+            self.cache.put(make_cache_key(persona, messages, answered_by[0], temperature, max_tokens), text)
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": reused_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": round(time.monotonic() - start, 3),
+            "cached": False,
+            "model": answered_by[0],
+        }
+        return text, usage
+
+    async def stream(self, messages, persona=None, round_num=0, usage=None, max_tokens=None, stop=None, governor=None,
+                     is_final_round=False):
+        """
+        Stream one completion, yielding text pieces as they arrive.
+
+        Pass a dict as `usage` to get the same fields complete() returns
+        once the stream is finished. With a length_governor.ReplyGovernor the
+        request is closed as soon as the governor says the reply is long enough.
+        """
+        usage = {} if usage is None else usage
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        candidates = self._candidates(persona, is_final_round)
+        start = time.monotonic()
+
+        # A cached reply comes back as a single piece
+        use_cache = bool(self.cache and persona)
+        if use_cache:
+            cached, cached_model = await self._cached(persona, messages, candidates, self.temperature, max_tokens)
+            if cached is not None:
+                usage.update(prompt_tokens=0, cached_prompt_tokens=0, completion_tokens=0, latency=0.0, cached=True,
+                             model=cached_model)
+                yield cached
+                return
+
+        timer = self._start_timer(persona, round_num)
+        model = None
+        sent = None
+
+        async def open_stream(attempt):
+            # Like complete(): each attempt takes its own budget and call slot, so
+            # backoff sleeps between attempts don't keep a slot from other debates
+            nonlocal model, sent
+            model = self._choose(candidates, streaming=True)
+            if timer:
+                timer.model = model
+            if self.upstream_limiter:
+                await self.upstream_limiter.acquire_async(estimate_message_tokens(messages))
+            await self.semaphore.acquire()
+            try:
+                if timer:
+                    timer.started()
+                attempt.sent()
+                sent = time.monotonic()
+                return await self.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    temperature=self.temperature,
+                    max_tokens=max_tokens,
+                    stop=stop,
+                    stream=True,
+                )
+            except BaseException as error:
+                # Also on cancellation - only a stream that opened keeps the slot
+                self.semaphore.release()
+                if isinstance(error, Exception):
+                    if timer:
+                        timer.fail(error)
+                    self._record_failure(model, candidates, error)
+                raise
+
+        # The slot taken by the attempt that opened the stream is held until the stream
+        # ends - the request is in flight until then
+        text = ""
+        stream_usage = None
+        stream = await self.caller.call_async(open_stream, hedge=False)
+        try:
+            first_token = True
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token and self.router:
+                            # Streams are judged on time to first token
+                            self.router.record_success(model, time.monotonic() - sent, first_token=True)
+                        first_token = False
+                        if timer:
+                            timer.first_token()
+                        piece = chunk.choices[0].delta.content
+                        if governor:
+                            piece = governor.feed(piece)
+                        text += piece
+                        if piece:
+                            yield piece
+                        if governor and governor.done:
+                            # Long enough - hang up instead of waiting for the rest
+                            break
+                    # Groq sends the token counts with the last chunk
+                    if chunk.x_groq and chunk.x_groq.usage:
+                        stream_usage = chunk.x_groq.usage
+            finally:
+                # Also runs when the debate is stopped mid-reply, so the request is dropped at once
+                await stream.close()
+
+            if governor and not governor.done:
+                rest = governor.finish()
+                text += rest
+                if rest:
+                    yield rest
+        finally:
+            self.semaphore.release()
+
+        prompt_tokens = stream_usage.prompt_tokens if stream_usage else estimate_message_tokens(messages)
+        completion_tokens = stream_usage.completion_tokens if stream_usage else estimate_tokens(text)
+        reused_tokens = cached_prompt_tokens(stream_usage)
+        if timer:
+            timer.finish(prompt_tokens, completion_tokens, reused_tokens)
+        if self.upstream_limiter:
+            self.upstream_limiter.consume(completion_tokens)
+
+        # Only cache replies that streamed all the way through
+        if use_cache:
+            self.cache.put(make_cache_key(persona, messages, model, self.temperature, max_tokens), text)
+
+        usage.update(
+            prompt_tokens=prompt_tokens,
+            cached_prompt_tokens=reused_tokens,
+            completion_tokens=completion_tokens,
+            latency=round(time.monotonic() - start, 3),
+            cached=False,
+            model=model,
+        )
+
+
+class Debate:
+    """
+    One debate: the speaking order, context window, scoring and transcript.
+
+    `run()` is an async generator of event dicts:
+      {"type": "round",    "round": n, "final": bool}
+      {"type": "speaking", "round": n, "participant": p}             (before a live reply)
+      {"type": "chunk",    "round": n, "participant": p, "delta": ..., "text": ...}  (text so far)
+      {"type": "turn",     "round": n, "participant": p, "text": ..., "usage": {...}, "saved": bool}
+
+    In simultaneous rounds "turn" events arrive as replies finish, and the
+    replies are added to the context in speaking order once the round is done.
+
+    With append_only_prompts=True the debate is sent as one chat message per
+    turn that only grows between context compactions, so Groq can reuse the
+    prompt prefix it already processed (see PanelPrompts.chat_messages).
+    """
+
+    def __init__(self, topic, num_rounds, llm, participants=None, simultaneous=False, stream=False,
+                 rng=None, transcript=None, recent_turns=8, token_budget=1500, summary_max_tokens=200,
+                 length_policy=None, mention_turns=3, append_only_prompts=False):
+        self.topic = topic
+        self.num_rounds = num_rounds
+        self.llm = llm
+        self.participants = list(participants or DEFAULT_PARTICIPANTS)
+        self.simultaneous = simultaneous
+        self.stream = stream
+        self.rng = rng or random
+        self.transcript = transcript  # transcript_store.DebateTranscript, for saving / resuming
+        self.summary_max_tokens = summary_max_tokens
+        self.length_policy = length_policy or LengthPolicy()  # Reply token budget, stop sequences, sentence limit
+        self.append_only_prompts = append_only_prompts
+
+        self.header = debate_header(self.participants, topic)
+        self.prompts = PanelPrompts(self.participants)
+        # Each speaker sees the recent turns plus older turns that mention them
+        self.context = DebateContext(
+            self.header,
+            recent_turns=recent_turns,
+            token_budget=token_budget,
+            summary_max_tokens=summary_max_tokens,
+            names=[p["name"] for p in self.participants],
+            mention_turns=mention_turns,
+            append_only=append_only_prompts,
+        )
+        self.scorer = DebateScorer(p["name"] for p in self.participants)
+        self.turns = []
+        self.totals = {"prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "calls": 0, "cached": 0}
+        self.started_at = None
+        self.duration = None
+
+    async def run(self):
+        """Run the whole debate, yielding events as it goes"""
+        self.started_at = time.time()
+        start = time.monotonic()
+
+        for round_num in range(self.num_rounds):
+            is_final_round = (round_num == self.num_rounds - 1)
+            yield {"type": "round", "round": round_num, "final": is_final_round}
+
+            round_order = self._round_order(round_num)
+            if self.simultaneous:
+                async for event in self._simultaneous_round(round_num, round_order, is_final_round):
+                    yield event
+            else:
+                for participant in round_order:
+                    async for event in self._turn(round_num, participant, is_final_round):
+                        yield event
+                    if self.context.needs_summary():
+                        await self._summarize(round_num)
+
+            if self.simultaneous and self.context.needs_summary():
+                await self._summarize(round_num)
+
+        self.duration = round(time.monotonic() - start, 3)
+        if self.transcript:
+            self.transcript.finish(self.scorer.scores)
+
+    def record(self):
+        """The finished debate as a JSON-ready dict"""
+        return {
+            "topic": self.topic,
+            "rounds": self.num_rounds,
+            "participants": [p["name"] for p in self.participants],
+            "simultaneous": self.simultaneous,
+            "turns": self.turns,
+            "scores": dict(self.scorer.standings()),
+            "mentions": {speaker: dict(targets) for speaker, targets in self.scorer.mentions.items()},
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "usage": self.totals,
+        }
+
+    def _round_order(self, round_num):
+        if self.transcript:
+            return self.transcript.round_order(round_num, self.participants, self.rng)
+        order = list(self.participants)
+        self.rng.shuffle(order)
+        return order
+
+    def _saved_reply(self, round_num, participant):
+        if self.transcript:
+            return self.transcript.saved_reply(round_num, participant["name"])
+        return None
+
+    def _prompt(self, participant, is_final_round):
+        """The messages for a participant's turn, from the context as it stands"""
+        if self.append_only_prompts:
+            background, turns, mentions = self.context.chat_history(participant["name"])
+            return self.prompts.chat_messages(participant, background, turns, mentions, is_final_round)
+        return self.prompts.messages(participant, self.context.render(participant["name"]), is_final_round)
+
+    async def _reply(self, round_num, participant, messages, is_final_round):
+        """One live reply; yields chunk events when streaming, then the turn event"""
+        policy = self.length_policy
+        max_tokens = policy.max_tokens(participant, is_final_round)
+        stop = policy.stop_sequences(participant, self.participants)
+
+        if self.stream:
+            usage = {}
+            text = ""
+            governor = policy.governor(participant, self.participants)
+            async for piece in self.llm.stream(messages, participant["name"], round_num, usage=usage,
+                                               max_tokens=max_tokens, stop=stop, governor=governor,
+                                               is_final_round=is_final_round):
+                text += piece
+                yield {"type": "chunk", "round": round_num, "participant": participant,
+                       "delta": piece, "text": text}
+        else:
+            text, usage = await self.llm.complete(messages, participant["name"], max_tokens=max_tokens,
+                                                  round_num=round_num, stop=stop, is_final_round=is_final_round)
+            text = policy.trim(text, participant, self.participants)
+
+        self._record_usage(usage)
+        # Saved before anything else can fail
+        if self.transcript:
+            self.transcript.log_turn(round_num, participant["name"], text)
+        yield {"type": "turn", "round": round_num, "participant": participant,
+               "text": text, "usage": usage, "saved": False}
+
+    async def _turn(self, round_num, participant, is_final_round):
+        saved = self._saved_reply(round_num, participant)
+        if saved is not None:
+            event = {"type": "turn", "round": round_num, "participant": participant,
+                     "text": saved, "usage": {}, "saved": True}
+        else:
+            yield {"type": "speaking", "round": round_num, "participant": participant}
+            async for event in self._reply(round_num, participant, self._prompt(participant, is_final_round),
+                                           is_final_round):
+                if event["type"] != "turn":
+                    yield event
+
+        self._add_turn(round_num, participant, event["text"], event["usage"])
+        yield event
+
+    async def _simultaneous_round(self, round_num, round_order, is_final_round):
+        # Everyone answers the same snapshot of the debate at once
+        snapshots = {p["name"]: self._prompt(p, is_final_round) for p in round_order}
+        replies = {}
+        for participant in round_order:
+            saved = self._saved_reply(round_num, participant)
+            if saved is not None:
+                replies[participant["name"]] = (saved, {})
+                yield {"type": "turn", "round": round_num, "participant": participant,
+                       "text": saved, "usage": {}, "saved": True}
+
+        async def respond(participant):
+            async for event in self._reply(round_num, participant, snapshots[participant["name"]], is_final_round):
+                if event["type"] == "turn":
+                    return event
+
+        tasks = [asyncio.create_task(respond(p)) for p in round_order if p["name"] not in replies]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event = await next_done
+                replies[event["participant"]["name"]] = (event["text"], event["usage"])
+                yield event
+        finally:
+            # Don't leave calls running if the debate is abandoned mid-round
+            for task in tasks:
+                task.cancel()
+
+        for participant in round_order:
+            text, usage = replies[participant["name"]]
+            self._add_turn(round_num, participant, text, usage)
+
+    def _add_turn(self, round_num, participant, text, usage):
+        self.context.add_turn(participant["name"], text)
+        self.scorer.add_message(participant["name"], text, round_num)
+        self.turns.append({"round": round_num + 1, "speaker": participant["name"], "text": text, **usage})
+
+    def _record_usage(self, usage):
+        self.totals["prompt_tokens"] += usage["prompt_tokens"]
+        self.totals["cached_prompt_tokens"] += usage["cached_prompt_tokens"]
+        self.totals["completion_tokens"] += usage["completion_tokens"]
+        self.totals["calls"] += 0 if usage["cached"] else 1
+        self.totals["cached"] += 1 if usage["cached"] else 0
+
+    async def _summarize(self, round_num):
+        """Fold turns that left the context window into the rolling summary"""
+        # A resumed debate reuses the summaries it already paid for
+        summary = self.transcript.next_saved_summary() if self.transcript else None
+        if summary is not None:
+            self.context.update_summary(summary)
+            return
+
+        summary, usage = await self.llm.complete(
+            self.context.build_summary_messages(),
+            temperature=0.3,  # Keep summaries factual
+            max_tokens=self.summary_max_tokens,
+            round_num=round_num,
+        )
+        self._record_usage(usage)
+        self.context.update_summary(summary)
+        if self.transcript:
+            self.transcript.log_summary(summary)
+
+
+async def run_headless_debate(topic, num_rounds, llm, participants=None, simultaneous=False,
+                              seed=None, recent_turns=8, token_budget=1500, summary_max_tokens=200,
+                              length_policy=None, mention_turns=3, append_only_prompts=False, stream=False):
+    """Run a whole debate without any UI and return it as a JSON-ready dict"""
+    debate = Debate(
+        topic,
+        num_rounds,
+        llm,
+        participants=participants,
+        simultaneous=simultaneous,
+        stream=stream,
+        rng=random.Random(seed) if seed is not None else None,
+        recent_turns=recent_turns,
+        token_budget=token_budget,
+        summary_max_tokens=summary_max_tokens,
+        length_policy=length_policy,
+        mention_turns=mention_turns,
+        append_only_prompts=append_only_prompts,
+    )
+    async for _ in debate.run():
+        pass
+    return debate.record()
@@ -0,0 +1,239 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================
+# DEBATE METRICS
+# ============================================
+# Records every Groq call made by the bots, labelled by participant and round:
+#   - queue wait   (waiting for the rate limiter / a free call slot)
+#   - latency      (request sent -> full reply received)
+#   - TTFT         (request sent -> first token)
+#   - prompt and completion tokens, and how many prompt tokens Groq served from its prompt cache
+#   - errors, by error type
+#
+# Values go into histograms that can be scraped in the Prometheus text
+# format (start_http_server) or printed as a plain summary (summary()).
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, like a Prometheus histogram"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count], sum, count
+        self._series = defaultdict(lambda: {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0})
+
+    def observe(self, labels, value):
+        series = self._series[labels]
+        series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def merged(self, keep=lambda labels: True):
+        """Combine every series whose labels pass `keep` into one"""
+        merged = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        for labels, series in self._series.items():
+            if keep(labels):
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], series["counts"])]
+                merged["sum"] += series["sum"]
+                merged["count"] += series["count"]
+        return merged
+
+    def quantile(self, series, q):
+        """Estimate a quantile from bucket counts (linear within the bucket)"""
+        if not series["count"]:
+            return None
+        rank = q * series["count"]
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (float("inf"),), series["counts"]):
+            if count and seen + count >= rank:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else f"{upper:g}"
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series['count']}")
+        return lines
+
+
+class CallTimer:
+    """Times one Groq call; create it with DebateMetrics.start_call"""
+
+    def __init__(self, metrics, participant, round_num, model=None):
+        self.metrics = metrics
+        self.participant = participant
+        self.round_num = round_num
+        self.model = model  # May be set later, once the model router has picked one
+        self.created = time.perf_counter()
+        self.sent = None
+        self.first_token_at = None
+
+    def started(self):
+        """Call once the request actually goes out (after rate limiting / queueing)"""
+        self.sent = time.perf_counter()
+
+    def first_token(self):
+        """Call when the first token of a streamed reply arrives"""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+        now = time.perf_counter()
+        sent = self.sent or self.created
+        # Non-streamed replies arrive all at once, so TTFT = full latency
+        first_token_at = self.first_token_at or now
+        self.metrics.record_call(
+            self.labels,
+            queue_wait=sent - self.created,
+            latency=now - sent,
+            ttft=first_token_at - sent,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_prompt_tokens=cached_prompt_tokens,
+        )
+
+    def fail(self, error):
+        self.metrics.record_error(self.labels, error)
+
+    @property
+    def labels(self):
+        labels = (("participant", self.participant), ("round", str(self.round_num)))
+        if self.model:
+            labels += (("model", self.model),)
+        return labels
+
+
+class DebateMetrics:
+    """Histograms and counters for every Groq call, with Prometheus and plain-text output"""
+
+    def __init__(self, prefix="debate"):
+        self.queue_wait = Histogram(f"{prefix}_llm_queue_wait_seconds", "Time waiting for rate limits and call slots", LATENCY_BUCKETS)
+        self.latency = Histogram(f"{prefix}_llm_request_seconds", "Groq request latency until the full reply", LATENCY_BUCKETS)
+        self.ttft = Histogram(f"{prefix}_llm_ttft_seconds", "Time to first token", LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(f"{prefix}_llm_prompt_tokens", "Prompt tokens per call", TOKEN_BUCKETS)
+        self.cached_prompt_tokens = Histogram(f"{prefix}_llm_cached_prompt_tokens", "Prompt tokens per call reused from Groq's cache", TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(f"{prefix}_llm_completion_tokens", "Completion tokens per call", TOKEN_BUCKETS)
+        self.errors = defaultdict(int)  # labels + error type -> count
+        self.prefix = prefix
+
+        self._gauges = []  # (name, help, fn)
+        self._lock = threading.Lock()
+
+    def start_call(self, participant, round_num, model=None):
+        """Begin timing a call; returns a CallTimer"""
+        return CallTimer(self, participant, round_num, model)
+
+    def record_call(self, labels, queue_wait, latency, ttft, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+        with self._lock:
+            self.queue_wait.observe(labels, queue_wait)
+            self.latency.observe(labels, latency)
+            self.ttft.observe(labels, ttft)
+            self.prompt_tokens.observe(labels, prompt_tokens)
+            self.cached_prompt_tokens.observe(labels, cached_prompt_tokens)
+            self.completion_tokens.observe(labels, completion_tokens)
+
+    def record_error(self, labels, error):
+        with self._lock:
+            self.errors[labels + (("error", type(error).__name__),)] += 1
+
+    def add_gauge(self, name, help_text, fn):
+        """Expose a live value (e.g. retries so far) read from fn() at scrape time"""
+        self._gauges.append((f"{self.prefix}_{name}", help_text, fn))
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for histogram in (self.queue_wait, self.latency, self.ttft, self.prompt_tokens, self.cached_prompt_tokens,
+                              self.completion_tokens):
+                lines.extend(histogram.render())
+
+            name = f"{self.prefix}_llm_errors_total"
+            lines += [f"# HELP {name} Failed Groq calls by error type", f"# TYPE {name} counter"]
+            for labels, count in sorted(self.errors.items()):
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                lines.append(f"{name}{{{label_text}}} {count}")
+
+        for name, help_text, fn in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {fn()}"]
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Plain-text summary per participant (for transcripts and logs)"""
+        with self._lock:
+            participants = sorted({dict(labels)["participant"] for labels in self.latency._series})
+            rows = [("ALL", lambda labels: True)]
+            rows += [(name, lambda labels, name=name: dict(labels)["participant"] == name) for name in participants]
+            # With the model router on, also break the calls down per model
+            models = sorted({dict(labels).get("model") for labels in self.latency._series} - {None})
+            if len(models) > 1:
+                rows += [(model, lambda labels, model=model: dict(labels).get("model") == model) for model in models]
+
+            lines = [f"{'participant / model':<24}{'calls':>6}{'lat p50':>9}{'lat p95':>9}{'ttft p50':>10}{'wait avg':>10}{'prompt':>9}{'cached':>8}{'compl':>8}"]
+            for name, keep in rows:
+                latency = self.latency.merged(keep)
+                if not latency["count"]:
+                    continue
+                ttft = self.ttft.merged(keep)
+                wait = self.queue_wait.merged(keep)
+                lines.append(
+                    f"{name:<24}{latency['count']:>6}"
+                    f"{self.latency.quantile(latency, 0.5):>8.2f}s"
+                    f"{self.latency.quantile(latency, 0.95):>8.2f}s"
+                    f"{self.ttft.quantile(ttft, 0.5):>9.2f}s"
+                    f"{wait['sum'] / wait['count']:>9.2f}s"
+                    f"{self.prompt_tokens.merged(keep)['sum']:>9.0f}"
+                    f"{self.cached_prompt_tokens.merged(keep)['sum']:>8.0f}"
+                    f"{self.completion_tokens.merged(keep)['sum']:>8.0f}"
+                )
+
+            error_count = sum(self.errors.values())
+        if error_count:
+            lines.append(f"errors: {error_count}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port=9464, host="0.0.0.0"):
+        """Serve /metrics in a background thread for Prometheus to scrape"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
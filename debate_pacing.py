@@ -0,0 +1,111 @@
+import asyncio
+
+# ============================================
+# PRESENTATION PACING
+# ============================================
+# The pauses that make a debate pleasant to watch used to sit inside the
+# debate loop, so every pause also left a worker and an upstream slot idle.
+# Now the debate is generated at full speed into a buffer, and a Pacer
+# replays the buffered events to the viewer at reading pace:
+#   - turn_pause        seconds to wait after each new turn
+#   - words_per_second  reading speed for streamed text (None = as fast as it arrives);
+#                       turns that weren't streamed get their reading time after they appear
+#
+# Pacer() with no arguments replays instantly (batch / headless runs).
+# Replies restored from a saved transcript are never paced.
+#
+# A replay can be given a stop event (e.g. set by the Stop button): once it's
+# set the replay ends at once and anything still buffered is dropped, instead
+# of being played out at reading pace.
+
+_END = object()      # Marks the end of the buffer
+_STOPPED = object()  # The stop event was set
+
+
+class Pacer:
+    """Replays debate events at reading pace while generation runs ahead"""
+
+    def __init__(self, turn_pause=0.0, words_per_second=None):
+        self.turn_pause = turn_pause
+        self.words_per_second = words_per_second
+
+    @property
+    def instant(self):
+        return not self.turn_pause and not self.words_per_second
+
+    async def replay(self, events, stop=None):
+        """
+        Yield the events of an async iterator (e.g. Debate.run()) at this pace.
+
+        The iterator is drained by a background task, so generation never
+        waits on the viewer. Stopping the replay early stops the generation
+        too, and an error in generation is raised here once the events
+        before it have been shown. Setting `stop` (an asyncio.Event) ends
+        the replay straight away.
+        """
+        if self.instant:
+            async for event in events:
+                if stop and stop.is_set():
+                    return
+                yield event
+            return
+
+        buffer = asyncio.Queue()
+
+        async def generate():
+            try:
+                async for event in events:
+                    buffer.put_nowait(event)
+            finally:
+                buffer.put_nowait(_END)
+
+        task = asyncio.ensure_future(generate())
+        stopping = asyncio.ensure_future(stop.wait()) if stop else None
+        streamed = set()  # (round, name) of turns already shown piece by piece
+        try:
+            while True:
+                event = await self._unless_stopped(buffer.get(), stopping)
+                if event is _STOPPED:
+                    return
+                if event is _END:
+                    break
+                yield event
+
+                delay = self.delay(event, streamed)
+                if delay and await self._unless_stopped(asyncio.sleep(delay), stopping) is _STOPPED:
+                    return
+            await task  # Re-raise a generation error
+        finally:
+            task.cancel()
+            if stopping:
+                stopping.cancel()
+
+    @staticmethod
+    async def _unless_stopped(coro, stopping):
+        # Await coro, or give up on it as soon as the stop event is set
+        if stopping is None:
+            return await coro
+        waiting = asyncio.ensure_future(coro)
+        await asyncio.wait([waiting, stopping], return_when=asyncio.FIRST_COMPLETED)
+        if stopping.done():
+            waiting.cancel()
+            return _STOPPED
+        return waiting.result()
+
+    def delay(self, event, streamed):
+        """Seconds to wait after showing `event`"""
+        if event["type"] == "chunk":
+            streamed.add((event["round"], event["participant"]["name"]))
+            return self._reading_time(event["delta"])
+
+        if event["type"] == "turn" and not event["saved"]:
+            delay = self.turn_pause
+            if (event["round"], event["participant"]["name"]) not in streamed:
+                delay += self._reading_time(event["text"])
+            return delay
+        return 0.0
+
+    def _reading_time(self, text):
+        if not self.words_per_second:
+            return 0.0
+        return len(text.split()) / self.words_per_second
@@ -0,0 +1,158 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+
+# ============================================
+# SPECTATOR ROOMS
+# ============================================
+# One debate, any number of viewers. The debate's events are published once
+# to its room, and every spectator subscribed to the room gets them through
+# their own queue - no extra Groq calls, however many people watch.
+#
+# A spectator who joins late first gets the backlog (everything so far, as
+# one "backlog" event so it can be shown at once), then live events. Streamed
+# pieces of finished turns are dropped from the backlog, so it stays about
+# the size of the transcript. Finished rooms stay open for replays until
+# keep_seconds have passed or max_rooms is reached.
+#
+# Visitors who started the same debate are subscribed under their session,
+# so detach(session) can end just their view when they press Stop.
+#
+# Like the scheduler, rooms live on the server's event loop.
+
+_CLOSED = object()  # Marks the end of a subscriber's queue
+
+
+class DebateRoom:
+    """One debate's event log plus its live subscribers"""
+
+    def __init__(self, room_id, topic, num_rounds, simultaneous):
+        self.room_id = room_id
+        self.topic = topic
+        self.num_rounds = num_rounds
+        self.simultaneous = simultaneous
+        self.created_at = time.time()
+        self.finished_at = None
+        self.job = None  # The scheduler job generating the debate (set by whoever started it)
+
+        self.backlog = []
+        self.status = "live"  # live -> done / stopped / failed
+        self._subscribers = {}  # queue -> session id of a visitor who started the debate (None for spectators)
+
+    @property
+    def live(self):
+        return self.status == "live"
+
+    @property
+    def spectators(self):
+        return len(self._subscribers)
+
+    def publish(self, event):
+        if event["type"] == "turn":
+            # The finished turn replaces its streamed pieces
+            name = event["participant"]["name"]
+            self.backlog = [
+                e for e in self.backlog
+                if not (e["type"] in ("speaking", "chunk") and e["round"] == event["round"]
+                        and e["participant"]["name"] == name)
+            ]
+        self.backlog.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def close(self, status):
+        """End the room for every subscriber (status: done, stopped or failed)"""
+        if not self.live:
+            return
+        self.status = status
+        self.finished_at = time.time()
+        for queue in self._subscribers:
+            queue.put_nowait(_CLOSED)
+
+    async def broadcast(self, events):
+        """Publish every event of an async iterator (e.g. Debate.run()) and pass it on"""
+        status = "stopped"  # Unless it finishes or fails: cancelled / abandoned
+        try:
+            async for event in events:
+                self.publish(event)
+                yield event
+            status = "done"
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            self.close(status)
+
+    def detach(self, session_id):
+        """End the subscriptions of one session (the room itself carries on); returns how many"""
+        queues = [queue for queue, owner in self._subscribers.items() if owner == session_id]
+        for queue in queues:
+            queue.put_nowait(_CLOSED)
+        return len(queues)
+
+    async def subscribe(self, session_id=None):
+        """The backlog as one {"type": "backlog", "events": [...]} event, then live events until the room closes"""
+        queue = asyncio.Queue()
+        self._subscribers[queue] = session_id
+        try:
+            yield {"type": "backlog", "events": list(self.backlog)}
+            if not self.live:
+                return
+            while True:
+                event = await queue.get()
+                if event is _CLOSED:
+                    return
+                yield event
+        finally:
+            self._subscribers.pop(queue, None)
+
+
+class RoomHub:
+    """All spectator rooms on this server, by room id"""
+
+    def __init__(self, max_rooms=200, keep_seconds=3600):
+        self.max_rooms = max_rooms
+        self.keep_seconds = keep_seconds
+        self.rooms = OrderedDict()  # room_id -> DebateRoom, oldest first
+
+    def open(self, topic, num_rounds, simultaneous):
+        """Create a room for a new debate"""
+        self._evict()
+        room = DebateRoom(uuid.uuid4().hex[:10], topic, num_rounds, simultaneous)
+        self.rooms[room.room_id] = room
+        return room
+
+    def get(self, room_id):
+        """A room by id (None if unknown or expired)"""
+        self._evict()
+        return self.rooms.get((room_id or "").strip())
+
+    def find_live(self, topic, num_rounds, simultaneous):
+        """A debate on the same topic and settings that's running right now, if any"""
+        for room in reversed(self.rooms.values()):
+            # A room without a job is still being set up and can't be held yet
+            if (room.live and room.job is not None and room.topic.strip() == topic.strip() and room.num_rounds == int(num_rounds)
+                    and room.simultaneous == bool(simultaneous)):
+                return room
+        return None
+
+    def detach(self, session_id):
+        """End one session's subscriptions in every room"""
+        return sum(room.detach(session_id) for room in self.rooms.values())
+
+    def live_rooms(self):
+        return sum(1 for room in self.rooms.values() if room.live)
+
+    def spectators(self):
+        return sum(room.spectators for room in self.rooms.values())
+
+    def _evict(self):
+        cutoff = time.time() - self.keep_seconds
+        for room_id, room in list(self.rooms.items()):
+            if not room.live and room.finished_at < cutoff:
+                del self.rooms[room_id]
+        # Still too many: drop the oldest finished rooms (live ones are never dropped)
+        finished = [room_id for room_id, room in self.rooms.items() if not room.live]
+        while len(self.rooms) >= self.max_rooms and finished:
+            del self.rooms[finished.pop(0)]
@@ -0,0 +1,219 @@
+import asyncio
+import math
+import time
+
+# ============================================
+# DEBATE JOB SCHEDULER
+# ============================================
+# Runs at most max_running debates at once and queues the rest. When a slot
+# frees up it goes to the session with the fewest debates running (oldest
+# request first on a tie), so one visitor with several tabs can't crowd out
+# everyone else.
+#
+# Each debate runs in its own task and its events are handed to the page
+# through a queue, so a debate can be cancelled at any time - from a Stop
+# button, when the visitor closes the tab, or when Gradio stops reading the
+# page's generator. Cancelling aborts the Groq request in flight and frees
+# the slot straight away.
+#
+# Several sessions can hold the same job (see hold): visitors who asked for a
+# debate that was already running are attached to it instead of starting a
+# second one. Stopping then only lets go of the job; it is cancelled once the
+# last session holding it has let go.
+#
+# Everything here runs on the server's event loop; call it from async code.
+
+DEFAULT_SECONDS_PER_ROUND = 20  # ETA guess until a few debates have finished
+
+_FINISHED = object()  # Marks the end of a job's event queue
+_LET_GO = object()    # Wakes the job's own session when it lets go while others still hold the job
+
+
+class DebateJob:
+    """One queued or running debate"""
+
+    def __init__(self, session_id, run, rounds):
+        self.session_id = session_id
+        self.holders = {session_id}  # Sessions that want this debate; cancelled when the last one lets go
+        self.run = run  # Called once the job gets a slot; returns an async iterator of events
+        self.rounds = rounds
+        self.state = "queued"  # queued -> running -> done / cancelled / failed
+        self.error = None
+        self.callbacks = []  # Called with the job once it has finished, however it ended
+        self.queued_at = time.monotonic()
+        self.started_at = None
+
+        self.task = None
+        self.started = asyncio.Event()
+        self.events = asyncio.Queue()
+
+    @property
+    def cancelled(self):
+        return self.state == "cancelled"
+
+
+class DebateScheduler:
+    """Fair-share queue for debate jobs with queue positions, ETAs and cancellation"""
+
+    def __init__(self, max_running, max_queued=100, seconds_per_round=DEFAULT_SECONDS_PER_ROUND, smoothing=0.2):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.seconds_per_round = seconds_per_round  # Smoothed from finished debates
+        self.smoothing = smoothing
+
+        self.queued = []    # Jobs waiting for a slot, in arrival order
+        self.running = set()
+        self.completed_jobs = 0
+        self.cancelled_jobs = 0
+
+    @property
+    def full(self):
+        return len(self.queued) >= self.max_queued
+
+    def submit(self, session_id, run, rounds):
+        """
+        Queue a debate; returns its DebateJob, or None when the queue is full.
+
+        `run` is called when the job gets a slot and must return an async
+        iterator of debate events (e.g. Debate(...).run).
+        """
+        if self.full:
+            return None
+        job = DebateJob(session_id, run, rounds)
+        self.queued.append(job)
+        self._dispatch()
+        return job
+
+    async def updates(self, job, interval=1.0):
+        """
+        Follow a job as the session that submitted it: yields {"type":
+        "queued", "position", "eta"} while it waits, then every event the
+        debate produces. Stopping early (or being cancelled) lets go of the
+        job, and ends early if that session lets go while others still hold it.
+        """
+        try:
+            while job.state == "queued" and job.session_id in job.holders:
+                yield {"type": "queued", "position": self.position(job), "eta": self.eta(job)}
+                try:
+                    await asyncio.wait_for(job.started.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            while True:
+                event = await job.events.get()
+                if event is _FINISHED or event is _LET_GO:
+                    break
+                yield event
+        finally:
+            # Nobody is watching any more (tab closed, generator dropped) - stop paying for it
+            self.release(job, job.session_id)
+
+        if job.error is not None:
+            raise job.error
+
+    def hold(self, job, session_id):
+        """Attach another session to a job; it keeps running until every holder lets go"""
+        job.holders.add(session_id)
+
+    def release(self, job, session_id):
+        """A session lets go of a job; cancels it once no session holds it"""
+        if session_id not in job.holders:
+            return
+        job.holders.discard(session_id)
+        if not job.holders:
+            self.cancel(job)
+        elif session_id == job.session_id:
+            job.events.put_nowait(_LET_GO)
+
+    def cancel(self, job):
+        """Cancel a queued or running job (no-op once it has finished)"""
+        if job.state == "queued":
+            self.queued.remove(job)
+            self._finish(job, "cancelled")
+        elif job.state == "running":
+            # The slot is freed once the task has unwound (see _task_done)
+            job.task.cancel()
+
+    def cancel_session(self, session_id):
+        """Let go of every job a session holds, cancelling those nobody else holds; returns how many"""
+        jobs = [job for job in self.queued + list(self.running) if session_id in job.holders]
+        for job in jobs:
+            self.release(job, session_id)
+        return len(jobs)
+
+    def position(self, job):
+        """1-based place in line for a queued job (0 once it's running)"""
+        if job.state != "queued":
+            return 0
+        return self._dispatch_order().index(job) + 1
+
+    def eta(self, job):
+        """Rough seconds until a queued job starts, from the work ahead of it"""
+        if job.state != "queued":
+            return 0
+        now = time.monotonic()
+        # Rounds still to go in running debates, plus every debate ahead in line
+        remaining = sum(
+            max(0.0, running.rounds * self.seconds_per_round - (now - running.started_at))
+            for running in self.running
+        )
+        order = self._dispatch_order()
+        remaining += sum(ahead.rounds * self.seconds_per_round for ahead in order[:order.index(job)])
+        return math.ceil(remaining / self.max_running)
+
+    def _dispatch_order(self):
+        # Replay the fair-share choice over the whole queue
+        running = {}
+        for job in self.running:
+            running[job.session_id] = running.get(job.session_id, 0) + 1
+        waiting = list(self.queued)
+        order = []
+        while waiting:
+            job = min(waiting, key=lambda j: (running.get(j.session_id, 0), j.queued_at))
+            waiting.remove(job)
+            running[job.session_id] = running.get(job.session_id, 0) + 1
+            order.append(job)
+        return order
+
+    def _dispatch(self):
+        while self.queued and len(self.running) < self.max_running:
+            job = self._dispatch_order()[0]
+            self.queued.remove(job)
+            self.running.add(job)
+            job.state = "running"
+            job.started_at = time.monotonic()
+            job.task = asyncio.ensure_future(self._run(job))
+            job.task.add_done_callback(lambda task, job=job: self._task_done(job, task))
+            job.started.set()
+
+    @staticmethod
+    async def _run(job):
+        async for event in job.run():
+            job.events.put_nowait(event)
+
+    def _task_done(self, job, task):
+        # A done callback also fires for a task cancelled before it ever started
+        self.running.discard(job)
+        if task.cancelled():
+            state = "cancelled"
+        elif task.exception() is not None:
+            job.error = task.exception()
+            state = "failed"
+        else:
+            state = "done"
+            if job.rounds:
+                per_round = (time.monotonic() - job.started_at) / job.rounds
+                self.seconds_per_round += self.smoothing * (per_round - self.seconds_per_round)
+        self._finish(job, state)
+        self._dispatch()
+
+    def _finish(self, job, state):
+        job.state = state
+        if state == "cancelled":
+            self.cancelled_jobs += 1
+        elif state == "done":
+            self.completed_jobs += 1
+        job.started.set()
+        job.events.put_nowait(_FINISHED)
+        for callback in job.callbacks:
+            callback(job)
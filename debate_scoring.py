@@ -0,0 +1,54 @@
+import re
+from collections import defaultdict
+
+# ============================================
+# INCREMENTAL DEBATE SCORING
+# ============================================
+# Scores are updated as each message is added, scanning only that message:
+# one compiled regex matches every participant name in a single pass.
+# A bot earns an engagement point each time ANOTHER bot mentions it by name,
+# so the participants header, speaker prefixes and self-mentions don't count.
+#
+# Along the way we keep a who-addressed-whom graph and per-round scores,
+# so the GUI can show live standings during the debate.
+
+
+class DebateScorer:
+    """Live engagement scores and mention graph for one debate"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        # Longest names first so e.g. "SkepticBot2" wins over "SkepticBot"
+        alternatives = "|".join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+        self._pattern = re.compile(rf"\b({alternatives})\b")
+
+        self.scores = {name: 0 for name in self.names}
+        self.mentions = defaultdict(lambda: defaultdict(int))        # speaker -> target -> count
+        self.round_scores = defaultdict(lambda: defaultdict(int))    # round -> name -> points
+
+    def add_message(self, speaker, text, round_num=0):
+        """Score one new message; returns the names it addressed"""
+        addressed = []
+        for match in self._pattern.finditer(text):
+            target = match.group(1)
+            if target == speaker:
+                continue
+            self.scores[target] += 1
+            self.mentions[speaker][target] += 1
+            self.round_scores[round_num][target] += 1
+            addressed.append(target)
+        return addressed
+
+    def standings(self):
+        """Return [(name, score)] sorted best first (ties keep participant order)"""
+        return sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+
+    def format_mentions(self):
+        """One line per speaker listing who they addressed, most often first"""
+        lines = []
+        for speaker in self.names:
+            targets = sorted(self.mentions[speaker].items(), key=lambda item: item[1], reverse=True)
+            if targets:
+                addressed = ", ".join(f"{target} ×{count}" for target, count in targets)
+                lines.append(f"{speaker} → {addressed}")
+        return "\n".join(lines) + "\n" if lines else ""
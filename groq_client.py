@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import importlib.util
+import time
+
+# ============================================
+# SHARED GROQ CLIENTS
+# ============================================
+# One pooled client per configuration, shared by everything in the process.
+#   - pool_size should match how many Groq calls can be in flight at once
+#     (e.g. MAX_CONCURRENT_LLM_CALLS in the GUI), so calls never queue for a
+#     connection and idle connections are kept for reuse
+#   - keep-alive keeps warm TLS connections around between turns
+#   - HTTP/2 is optional and needs the `h2` package (pip install "httpx[http2]")
+#   - warm_up_async opens connections ahead of time so the first
+#     debate doesn't pay for DNS + TLS handshakes on the user's clock
+#
+# groq and httpx are imported when the first client is built, not when this
+# module is imported, so scripts that never call Groq start fast.
+
+# When each client was last warmed: id(client) -> time.monotonic()
+_last_warmup = {}
+
+
+def http2_available():
+    """True if the optional h2 package needed for HTTP/2 is installed"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _http_settings(pool_size, keepalive_expiry, http2, timeout):
+    import httpx
+
+    if http2 and not http2_available():
+        print("⚠️ HTTP/2 requested but the 'h2' package isn't installed - using HTTP/1.1")
+        http2 = False
+    return {
+        "limits": httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        "http2": http2,
+        "timeout": timeout,
+        "follow_redirects": True,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_client(api_key, pool_size=10, keepalive_expiry=120, http2=False, timeout=30, base_url=None):
+    """Return the shared async Groq client for these settings"""
+    import httpx
+    from groq import AsyncGroq
+
+    settings = _http_settings(pool_size, keepalive_expiry, http2, timeout)
+    return AsyncGroq(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,  # resilient_calls handles retries
+        timeout=timeout,
+        http_client=httpx.AsyncClient(**settings),
+    )
+
+
+def _due_for_warmup(client, min_interval):
+    last = _last_warmup.get(id(client))
+    if last is not None and time.monotonic() - last < min_interval:
+        return False
+    _last_warmup[id(client)] = time.monotonic()
+    return True
+
+
+async def warm_up_async(client, connections=1, min_interval=0):
+    """Open `connections` pooled connections to Groq concurrently"""
+    if not _due_for_warmup(client, min_interval):
+        return
+    results = await asyncio.gather(
+        *(client.models.list() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        print(f"⚠️ Groq warmup failed: {errors[0]}")
@@ -0,0 +1,128 @@
+import re
+
+# ============================================
+# REPLY LENGTH GOVERNOR
+# ============================================
+# The bots are told to keep it to "2-3 punchy sentences", but nothing made
+# the API stop there. Three controls keep replies (and their cost) short:
+#   - a tight max_tokens per turn instead of 1024 (persona and final-round aware)
+#   - stop sequences like "\nTrollBot:" so a bot can't go on to write the
+#     other participants' turns
+#   - while streaming, the request is cut off as soon as the sentence limit
+#     is reached, so we stop waiting on (and paying for) tokens nobody sees
+#
+# A persona can override the defaults with "max_tokens" / "max_sentences" keys.
+
+MAX_STOP_SEQUENCES = 4  # Groq accepts at most 4 stop sequences per request
+
+# A sentence ends with . ! or ? (plus any closing quotes/brackets), then whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"'”’)\]]*(?=\s)")
+
+
+class LengthPolicy:
+    """How long a bot's turn may get"""
+
+    def __init__(self, reply_tokens=160, final_reply_tokens=220, max_sentences=3, stop_at_other_speakers=True):
+        self.reply_tokens = reply_tokens
+        self.final_reply_tokens = final_reply_tokens
+        self.max_sentences = max_sentences
+        self.stop_at_other_speakers = stop_at_other_speakers
+
+    def max_tokens(self, participant, is_final_round=False):
+        """Token budget for one turn (closing statements get a little more room); None = model default"""
+        budget = participant.get("max_tokens", self.reply_tokens)
+        if is_final_round and budget and self.final_reply_tokens:
+            budget = max(budget, self.final_reply_tokens)
+        return budget
+
+    def sentence_limit(self, participant):
+        return participant.get("max_sentences", self.max_sentences)
+
+    def stop_sequences(self, participant, participants):
+        """Stop before the bot starts writing someone else's turn"""
+        if not self.stop_at_other_speakers:
+            return None
+        others = [p["name"] for p in participants if p["name"] != participant["name"]]
+        return [f"\n{name}:" for name in others][:MAX_STOP_SEQUENCES] or None
+
+    def governor(self, participant, participants):
+        """A ReplyGovernor for one streamed turn"""
+        return ReplyGovernor(self._label_names(participants), self.sentence_limit(participant))
+
+    def trim(self, text, participant, participants):
+        """Apply the same cut to a reply that wasn't streamed"""
+        return trim_reply(text, self._label_names(participants), self.sentence_limit(participant))
+
+    def _label_names(self, participants):
+        return [p["name"] for p in participants] if self.stop_at_other_speakers else []
+
+
+class ReplyGovernor:
+    """
+    Watches a streamed reply and says when to stop.
+
+    feed() returns the new text that is safe to show. Text that could be the
+    start of a "\\nName:" line is held back until it's clear either way, so a
+    cut-off speaker label never flashes on screen.
+    """
+
+    def __init__(self, names, max_sentences=None):
+        self.labels = [f"\n{name}:" for name in names]
+        self.max_sentences = max_sentences
+        self.text = ""
+        self.shown = 0
+        self.done = False
+
+    def feed(self, piece):
+        if self.done:
+            return ""
+        self.text += piece
+
+        cut = cut_point(self.text, self.labels, self.max_sentences)
+        if cut is not None:
+            self.text = self.text[:cut].rstrip()
+            self.done = True
+            return self._show(len(self.text))
+        return self._show(self._safe_length())
+
+    def finish(self):
+        """The stream ended on its own: show whatever was held back"""
+        self.text = self.text.rstrip()
+        return self._show(len(self.text))
+
+    def _show(self, upto):
+        new = self.text[self.shown:upto]
+        self.shown = max(self.shown, upto)
+        return new
+
+    def _safe_length(self):
+        # Hold back a trailing "\nSom" that might turn into "\nSomeBot:"
+        newline = self.text.rfind("\n")
+        if newline == -1 or not self.labels:
+            return len(self.text)
+        tail = self.text[newline:]
+        if any(label.startswith(tail) for label in self.labels):
+            return newline
+        return len(self.text)
+
+
+def cut_point(text, labels, max_sentences=None):
+    """Where a reply should end: before another speaker's label or after the last allowed sentence"""
+    cut = None
+    for label in labels:
+        index = text.find(label)
+        if index != -1 and (cut is None or index < cut):
+            cut = index
+
+    if max_sentences:
+        end = len(text) if cut is None else cut
+        for count, match in enumerate(SENTENCE_END.finditer(text, 0, end), 1):
+            if count == max_sentences:
+                return match.end()
+    return cut
+
+
+def trim_reply(text, names, max_sentences=None):
+    """Cut a finished reply at another speaker's label or the sentence limit"""
+    cut = cut_point(text, [f"\n{name}:" for name in names], max_sentences)
+    return (text if cut is None else text[:cut]).strip()
@@ -0,0 +1,271 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================
+# MOCK GROQ SERVER
+# ============================================
+# A local stand-in for the Groq API so the debates can be benchmarked
+# offline without spending real quota. It speaks just enough of the API
+# for the groq SDK:
+#   POST /openai/v1/chat/completions  (normal and streaming responses)
+#   GET  /openai/v1/models            (used by the connection warmup)
+#
+# Point a client at it with GROQ_BASE_URL=http://127.0.0.1:<port>
+#
+# Like Groq's prompt caching, a prompt that starts with the same messages as
+# an earlier one reports those tokens as cached_tokens, and with prompt_rate
+# set only the uncached part of the prompt adds to the time to first token.
+#
+# Usage:
+#   python mock_groq_server.py --port 8787 --latency 0.3 --token-rate 250 --error-rate 0.02 --prompt-rate 5000
+
+FILLER_WORDS = (
+    "that argument falls apart the moment you look at the evidence and nobody here "
+    "has shown me a single reason to believe otherwise so I am standing firm"
+).split()
+
+DEFAULT_NAMES = ["TrollBot", "LogicalBot", "EmpathyBot", "SkepticBot"]
+
+MAX_CACHED_PREFIXES = 100000  # The prompt cache starts over past this many
+
+
+def message_tokens(message):
+    return len(message.get("content") or "") // 4
+
+
+class MockSettings:
+    """Behaviour knobs for the mock server (shared by all request threads)"""
+
+    def __init__(self, latency=0.2, jitter=0.05, token_rate=200, error_rate=0.0,
+                 reply_tokens=45, tokens_per_chunk=3, prompt_rate=None):
+        self.latency = latency              # Seconds before the first token
+        self.jitter = jitter                # Random extra latency, 0..jitter seconds
+        self.token_rate = token_rate        # Generated tokens per second
+        self.error_rate = error_rate        # Fraction of requests that fail with 429/500
+        self.reply_tokens = reply_tokens    # Tokens per reply (capped by max_tokens)
+        self.tokens_per_chunk = tokens_per_chunk
+        self.prompt_rate = prompt_rate      # Uncached prompt tokens read per second (None = instantly)
+
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._prefixes = set()              # Hashes of every message prefix seen so far
+        self._lock = threading.Lock()
+
+    def count(self, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1 if error else 0
+
+    def cache_prompt(self, messages):
+        """Remember every message prefix of this prompt; returns the tokens of the longest one seen before"""
+        digest = hashlib.sha256()
+        cached = tokens = 0
+        with self._lock:
+            if len(self._prefixes) > MAX_CACHED_PREFIXES:
+                self._prefixes.clear()
+            for message in messages:
+                digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+                key = digest.digest()
+                tokens += message_tokens(message)
+                if key in self._prefixes:
+                    cached = tokens  # The hash covers the whole prefix, so everything before matched too
+                self._prefixes.add(key)
+            self.prompt_tokens += tokens
+            self.cached_prompt_tokens += cached
+        return cached
+
+
+def fake_reply(messages, max_tokens, reply_tokens):
+    """Build a reply that calls out other participants by name, like the real bots do"""
+    system = messages[0]["content"] if messages else ""
+    speaker = next((name for name in DEFAULT_NAMES if f"You are {name}" in system), None)
+    others = [name for name in DEFAULT_NAMES if name != speaker] or DEFAULT_NAMES
+
+    words = [f"{random.choice(others)},"]
+    while len(words) < min(max_tokens, reply_tokens):
+        word = random.choice(FILLER_WORDS)
+        # End a sentence every dozen words or so, like a real reply
+        if len(words) % 12 == 11:
+            word += "."
+        words.append(word)
+    return " ".join(words).rstrip(",.") + "."
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/openai/v1/models":
+            return self._send_json(404, {"error": {"message": "not found"}})
+        self._send_json(200, {
+            "object": "list",
+            "data": [{"id": "llama-3.3-70b-versatile", "object": "model", "created": 0, "owned_by": "mock"}],
+        })
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            return self._send_json(404, {"error": {"message": "not found"}})
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        settings = self.settings
+        messages = body.get("messages", [])
+        cached_tokens = settings.cache_prompt(messages)
+        prompt_tokens = sum(message_tokens(m) for m in messages) + 1
+
+        # Reading the prompt takes time too, except for the cached part
+        prefill = (prompt_tokens - cached_tokens) / settings.prompt_rate if settings.prompt_rate else 0.0
+        time.sleep(settings.latency + prefill + random.uniform(0, settings.jitter))
+
+        if random.random() < settings.error_rate:
+            settings.count(error=True)
+            if random.random() < 0.5:
+                return self._send_json(429, {"error": {"message": "mock rate limit"}}, {"retry-after": "0.1"})
+            return self._send_json(500, {"error": {"message": "mock server error"}})
+        settings.count()
+
+        reply = fake_reply(messages, body.get("max_tokens") or 1024, settings.reply_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(reply.split()),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            self._stream(completion_id, model, reply, usage)
+        else:
+            time.sleep(usage["completion_tokens"] / settings.token_rate)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _stream(self, completion_id, model, reply, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None, extra=None):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            data.update(extra or {})
+            self._write_chunk(f"data: {json.dumps(data)}\n\n")
+
+        words = reply.split()
+        step = self.settings.tokens_per_chunk
+        try:
+            chunk({"role": "assistant", "content": ""})
+            for i in range(0, len(words), step):
+                piece = " ".join(words[i:i + step])
+                chunk({"content": piece if i == 0 else " " + piece})
+                time.sleep(len(words[i:i + step]) / self.settings.token_rate)
+            chunk({}, "stop", {"x_groq": {"id": completion_id, "usage": usage}})
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hung up mid-stream (e.g. a cancelled debate)
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockGroqServer:
+    """Runs the mock API in a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=0, **settings):
+        self.httpd = ThreadingHTTPServer((host, port), MockGroqHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = MockSettings(**settings)
+        self._thread = None
+
+    @property
+    def settings(self):
+        return self.httpd.settings
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Groq chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Random extra latency (seconds)")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--reply-tokens", type=int, default=45, help="Tokens per reply")
+    parser.add_argument("--prompt-rate", type=float, help="Uncached prompt tokens read per second (default: instantly)")
+    args = parser.parse_args()
+
+    server = MockGroqServer(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter, token_rate=args.token_rate,
+        error_rate=args.error_rate, reply_tokens=args.reply_tokens, prompt_rate=args.prompt_rate,
+    )
+    print(f"Mock Groq API on {server.base_url} - set GROQ_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
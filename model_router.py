@@ -0,0 +1,146 @@
+import threading
+import time
+
+from resilient_calls import retry_after_seconds
+
+# ============================================
+# MODEL ROUTER
+# ============================================
+# Picks the Groq model for each call from a small routing table, e.g.
+#   {
+#       "default": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"],
+#       "final":   ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"],
+#   }
+# Each entry lists models in order of preference. A bot's turn looks up
+# "<Name>:final" / "final" in the last round, then "<Name>", then "default";
+# context summaries look up "summary", then "default".
+#
+# The router keeps an error count and two smoothed latencies per model - the
+# full completion time and, for streamed calls, the time to the first token -
+# and skips a model while it is:
+#   - cooling down after a 429 (for Retry-After), repeated errors or a 404
+#   - slower than slow_seconds (completions) or slow_first_token_seconds
+#     (streams) while a later choice is fast enough
+# Skipped models get re-tried once their cool-down ends or their latency
+# reading goes stale, so a model that recovers is picked up again.
+
+RATE_LIMIT_COOLDOWN = 10     # Seconds to avoid a model after a 429 with no Retry-After
+MISSING_MODEL_COOLDOWN = 600  # A 404 usually means the model was retired
+
+
+class ModelHealth:
+    """Observed latency and errors for one model"""
+
+    def __init__(self):
+        self.latency = {}            # "completion" / "first_token" -> smoothed seconds (EWMA)
+        self.sampled_at = {}         # Same keys -> when that reading was last updated
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+
+class ModelRouter:
+    """Chooses a model per persona/round and falls back when one is slow or failing"""
+
+    def __init__(self, routes, slow_seconds=6.0, slow_first_token_seconds=2.0, failures_to_cool_down=2,
+                 cooldown_seconds=30, stale_after=120, smoothing=0.2):
+        self.routes = {key: [value] if isinstance(value, str) else list(value) for key, value in routes.items()}
+        if "default" not in self.routes:
+            raise ValueError("MODEL_ROUTES needs a 'default' entry")
+        self.slow_seconds = {"completion": slow_seconds, "first_token": slow_first_token_seconds}
+        self.failures_to_cool_down = failures_to_cool_down
+        self.cooldown_seconds = cooldown_seconds
+        self.stale_after = stale_after
+        self.smoothing = smoothing
+
+        self.health = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, persona=None, is_final_round=False):
+        """Models to try for this call, best first"""
+        if persona is None:
+            keys = ["summary"]
+        else:
+            keys = [f"{persona}:final", "final"] if is_final_round else []
+            keys.append(persona)
+        for key in keys + ["default"]:
+            if key in self.routes:
+                return self.routes[key]
+
+    def choose(self, candidates, streaming=False):
+        """The first model that isn't cooling down or slow (or the least bad one); streams are judged on first token"""
+        kind = "first_token" if streaming else "completion"
+        now = time.monotonic()
+        with self._lock:
+            health = [(model, self._health(model)) for model in candidates]
+            ready = [(model, h) for model, h in health if h.cooldown_until <= now]
+            if not ready:
+                return min(health, key=lambda item: item[1].cooldown_until)[0]
+
+            for model, h in ready:
+                # No recent reading counts as fast, so skipped models get probed again
+                latency = h.latency.get(kind)
+                if (latency is None or now - h.sampled_at[kind] > self.stale_after
+                        or latency <= self.slow_seconds[kind]):
+                    return model
+            return min(ready, key=lambda item: item[1].latency[kind])[0]
+
+    def has_alternative(self, model, candidates):
+        """True if another candidate could take over from `model` right now"""
+        now = time.monotonic()
+        with self._lock:
+            return any(m != model and self._health(m).cooldown_until <= now for m in candidates)
+
+    def record_success(self, model, seconds, first_token=False):
+        """Record a call's full completion time, or its time to first token for a stream"""
+        kind = "first_token" if first_token else "completion"
+        with self._lock:
+            h = self._health(model)
+            h.calls += 1
+            h.consecutive_failures = 0
+            latency = h.latency.get(kind)
+            h.latency[kind] = seconds if latency is None else latency + self.smoothing * (seconds - latency)
+            h.sampled_at[kind] = time.monotonic()
+
+    def record_failure(self, model, error):
+        status = getattr(error, "status_code", None)
+        with self._lock:
+            h = self._health(model)
+            h.calls += 1
+            h.failures += 1
+            h.consecutive_failures += 1
+
+            cooldown = 0
+            if status == 429:
+                cooldown = retry_after_seconds(error) or RATE_LIMIT_COOLDOWN
+            elif status == 404:
+                cooldown = MISSING_MODEL_COOLDOWN
+            elif h.consecutive_failures >= self.failures_to_cool_down:
+                cooldown = self.cooldown_seconds
+            if cooldown:
+                h.cooldown_until = max(h.cooldown_until, time.monotonic() + cooldown)
+
+    def snapshot(self):
+        """Per-model stats for logs and metrics"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    "latency": self._rounded(h.latency.get("completion")),
+                    "first_token_latency": self._rounded(h.latency.get("first_token")),
+                    "calls": h.calls,
+                    "error_rate": round(h.failures / h.calls, 3) if h.calls else 0.0,
+                    "cooling_down": max(0.0, round(h.cooldown_until - now, 1)),
+                }
+                for model, h in self.health.items()
+            }
+
+    @staticmethod
+    def _rounded(seconds):
+        return None if seconds is None else round(seconds, 3)
+
+    def _health(self, model):
+        if model not in self.health:
+            self.health[model] = ModelHealth()
+        return self.health[model]
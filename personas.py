@@ -0,0 +1,66 @@
+import json
+import os
+
+# ============================================
+# PERSONAS
+# ============================================
+# The debate bots are defined in a JSON file instead of in code, so a panel
+# can grow (or change) without touching any script:
+#   {"personas": [
+#       {"name": "TrollBot", "emoji": "🔵", "color": "blue",
+#        "tagline": "Chaos agent causing havoc", "personality": "You are ..."},
+#       ...
+#   ]}
+# "emoji" marks the bot in the GUI, "color" in the terminal (see ANSI_COLORS)
+# and "tagline" is its one-line intro. A persona may also set "max_tokens" /
+# "max_sentences" to override the reply length limits.
+
+PERSONAS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PERSONAS_FILE = os.path.join(PERSONAS_DIR, "personas.json")
+
+ANSI_COLORS = {
+    "red": "\033[91m",
+    "green": "\033[92m",
+    "yellow": "\033[93m",
+    "blue": "\033[94m",
+    "magenta": "\033[95m",
+    "cyan": "\033[96m",
+    "white": "\033[97m",
+    "dark_red": "\033[31m",
+    "dark_green": "\033[32m",
+    "dark_yellow": "\033[33m",
+    "dark_blue": "\033[34m",
+    "dark_magenta": "\033[35m",
+    "dark_cyan": "\033[36m",
+    "grey": "\033[90m",
+}
+
+
+def load_personas(path=DEFAULT_PERSONAS_FILE):
+    """Read and check a personas file; returns the persona dicts in file order"""
+    # A relative path that isn't in the working directory is looked up next to the scripts
+    if not os.path.isabs(path) and not os.path.exists(path):
+        path = os.path.join(PERSONAS_DIR, path)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    personas = data["personas"] if isinstance(data, dict) else data
+
+    seen = set()
+    loaded = []
+    for index, persona in enumerate(personas, 1):
+        name = str(persona.get("name", "")).strip()
+        if not name or not persona.get("personality"):
+            raise ValueError(f"{path}: persona #{index} needs a 'name' and a 'personality'")
+        if name in seen:
+            raise ValueError(f"{path}: two personas are called '{name}'")
+        seen.add(name)
+
+        color = persona.get("color", "white")
+        if color not in ANSI_COLORS:
+            raise ValueError(f"{path}: {name} has unknown color '{color}' (use one of: {', '.join(ANSI_COLORS)})")
+
+        loaded.append(dict(persona, name=name, emoji=persona.get("emoji", "⚪"), ansi=ANSI_COLORS[color]))
+
+    if len(loaded) < 2:
+        raise ValueError(f"{path}: a debate needs at least 2 personas")
+    return loaded
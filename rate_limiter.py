@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+# ============================================
+# RATE LIMITING
+# ============================================
+# SessionRateLimiter - per-visitor limits (debates and rounds per hour).
+#   Each session keeps a deque of (timestamp, rounds) plus a running total,
+#   so checking a limit only touches the entries that just expired.
+#   Idle sessions are dropped by a background thread and the number of
+#   tracked sessions is capped, so memory stays bounded on a long-running server.
+#
+# UpstreamLimiter - one global token bucket for Groq requests/tokens per minute,
+#   shared by every debate in the process.
+
+
+class SessionRateLimiter:
+    """Sliding-window debate/round limits per session with idle eviction"""
+
+    def __init__(self, max_debates, max_rounds, window_seconds=3600,
+                 idle_timeout=3600, max_sessions=10000):
+        self.max_debates = max_debates
+        self.max_rounds = max_rounds
+        self.window_seconds = window_seconds
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+
+        # session_id -> {"debates": deque[(ts, rounds)], "total_rounds": int, "last_seen": ts}
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictor = None
+
+    def try_record(self, session_id, num_rounds):
+        """
+        Check the limits and, if allowed, record the debate in one step.
+
+        Returns (allowed, debates_used, rounds_used), where the usage numbers
+        are the ones from before this debate.
+        """
+        now = time.time()
+        with self._lock:
+            data = self._session(session_id, now)
+            self._expire(data, now)
+
+            num_debates = len(data["debates"])
+            total_rounds = data["total_rounds"]
+            if num_debates >= self.max_debates or total_rounds + num_rounds > self.max_rounds:
+                return False, num_debates, total_rounds
+
+            data["debates"].append((now, num_rounds))
+            data["total_rounds"] += num_rounds
+            return True, num_debates, total_rounds
+
+    def evict_idle(self):
+        """Drop sessions that have been idle longer than idle_timeout"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            # Sessions are kept in last-seen order, so stop at the first active one
+            while self._sessions:
+                session_id, data = next(iter(self._sessions.items()))
+                if data["last_seen"] > cutoff:
+                    break
+                del self._sessions[session_id]
+
+    def start_eviction_thread(self, interval=60):
+        """Run evict_idle every interval seconds in a daemon thread"""
+        if self._evictor is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._evictor = threading.Thread(target=loop, name="rate-limit-evictor", daemon=True)
+        self._evictor.start()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _session(self, session_id, now):
+        data = self._sessions.get(session_id)
+        if data is None:
+            data = {"debates": deque(), "total_rounds": 0, "last_seen": now}
+            self._sessions[session_id] = data
+            # Hard cap: forget the least recently seen sessions first
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            data["last_seen"] = now
+            self._sessions.move_to_end(session_id)
+        return data
+
+    def _expire(self, data, now):
+        cutoff = now - self.window_seconds
+        debates = data["debates"]
+        while debates and debates[0][0] <= cutoff:
+            _, rounds = debates.popleft()
+            data["total_rounds"] -= rounds
+
+
+class UpstreamLimiter:
+    """Global token bucket for requests per minute and tokens per minute"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens):
+        """
+        Take one request and `tokens` tokens from the buckets if available.
+
+        Returns 0 on success, otherwise how many seconds to wait before retrying.
+        """
+        # A single request bigger than the whole bucket would wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            self._refill()
+            if self._requests >= 1 and self._tokens >= tokens:
+                self._requests -= 1
+                self._tokens -= tokens
+                return 0
+
+            request_wait = max(0.0, 1 - self._requests) * 60 / self.requests_per_minute
+            token_wait = max(0.0, tokens - self._tokens) * 60 / self.tokens_per_minute
+            return max(request_wait, token_wait)
+
+    async def acquire_async(self, tokens):
+        """Wait (without blocking the event loop) until the request fits in the budget"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def consume(self, tokens):
+        """Charge tokens that were only known after the call (e.g. the completion)"""
+        with self._lock:
+            self._refill()
+            # May go negative - later callers then wait for the debt to refill
+            self._tokens -= tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
@@ -0,0 +1,271 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# ============================================
+# RESILIENT GROQ CALLS
+# ============================================
+# Wraps every Groq call made by DebateLLM:
+#   - retries 429s, 5xx and connection errors with jittered exponential
+#     backoff, waiting at least as long as the server's Retry-After header
+#   - per-call timeouts
+#   - hedging: if a call runs longer than the recent p95 latency, a second
+#     identical request is fired and whichever answers first wins
+#   - a circuit breaker that fails fast while Groq is down instead of
+#     making every debate wait through a full set of retries
+#
+# Create the Groq clients with max_retries=0 so the SDK doesn't retry on
+# top of this layer.
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Groq while the circuit breaker is open"""
+
+
+def is_retryable(error):
+    """True for errors worth retrying: rate limits, server errors, timeouts, dropped connections"""
+    # The model router found another model to send the retry to
+    if getattr(error, "can_fall_back", False):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    # groq is only looked up if it's already loaded - an error can't come from it otherwise
+    groq = sys.modules.get("groq")
+    connection_errors = (TimeoutError, asyncio.TimeoutError, ConnectionError)
+    if groq is not None:
+        connection_errors += (groq.APIConnectionError,)
+    return isinstance(error, connection_errors)
+
+
+def retry_after_seconds(error):
+    """Read the Retry-After (or retry-after-ms) header from an error response, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures, then lets a trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError if calls should fail fast right now"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"Groq looks unavailable - retrying in {remaining:.0f}s")
+            # Cool-down over ("half-open"): let calls through until one fails or succeeds
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                # Also re-opens straight away if a half-open trial call fails
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """Return the pct-th percentile of recent latencies, or None if there are no samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class Attempt:
+    """One try at a call; the request function calls sent() once it's past rate limits and queues"""
+
+    def __init__(self):
+        self.sent_at = None
+        self._sent = asyncio.Event()
+
+    def sent(self):
+        self.sent_at = time.monotonic()
+        self._sent.set()
+
+    async def wait_sent(self):
+        await self._sent.wait()
+
+
+class ResilientCaller:
+    """Runs Groq calls with retries, timeouts, hedging and a shared circuit breaker"""
+
+    def __init__(self, max_retries=4, base_delay=0.5, max_delay=20, timeout=30,
+                 hedge=True, hedge_percentile=95, hedge_min_samples=20,
+                 breaker=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+
+        self.retries = 0
+        self.hedges = 0
+
+    def backoff_delay(self, attempt, error=None):
+        """Full-jitter exponential backoff, but never shorter than Retry-After"""
+        if getattr(error, "can_fall_back", False):
+            # The retry goes to a different model - no need to wait out this one's limit
+            return random.uniform(0, self.base_delay)
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def hedge_delay(self):
+        """How long to wait before firing a hedged request, or None to not hedge"""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def call_async(self, fn, hedge=True):
+        """
+        Await fn(attempt) (a coroutine function making a Groq call) with retries, timeouts and hedging.
+
+        fn must call attempt.sent() right before the request goes out: time
+        spent waiting for rate limits or a call slot doesn't count towards
+        the timeout, the latency percentiles or the hedging delay, so a busy
+        server doesn't time out, hedge or trip the breaker on requests that
+        are only queued.
+
+        Pass hedge=False for calls that open a stream - opening one is much
+        faster than a full completion, so it would skew the latency percentiles.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check()
+            try:
+                result, winner = await self._hedged_async(fn, hedge)
+            except Exception as error:
+                if not self._should_retry(error, attempt):
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt, error))
+                continue
+            self._record_success(time.monotonic() - winner.sent_at, hedge)
+            return result
+
+    def _should_retry(self, error, attempt):
+        if not is_retryable(error):
+            return False
+        self.breaker.record_failure()
+        if attempt == self.max_retries:
+            return False
+        self.retries += 1
+        return True
+
+    def _record_success(self, seconds, track_latency):
+        if track_latency:
+            self.latency.record(seconds)
+        self.breaker.record_success()
+
+    async def _timed(self, fn, attempt):
+        # Like wait_for(fn(attempt), timeout), but the clock starts at attempt.sent()
+        task = asyncio.ensure_future(fn(attempt))
+        sent = asyncio.ensure_future(attempt.wait_sent())
+        try:
+            await asyncio.wait([task, sent], return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                remaining = self.timeout - (time.monotonic() - attempt.sent_at)
+                await asyncio.wait([task], timeout=max(0.0, remaining))
+            if not task.done():
+                raise TimeoutError(f"Groq didn't answer within {self.timeout}s")
+            return task.result()
+        finally:
+            sent.cancel()
+            task.cancel()
+
+    async def _hedged_async(self, fn, hedge):
+        # Returns (result, the Attempt that produced it)
+        attempts = [Attempt()]
+        tasks = [asyncio.ensure_future(self._timed(fn, attempts[0]))]
+        waiting = None
+        try:
+            hedge_after = self.hedge_delay() if hedge else None
+            if hedge_after is None:
+                return await tasks[0], attempts[0]
+
+            # The hedging clock starts once the request is out, not while it's queued
+            waiting = asyncio.ensure_future(attempts[0].wait_sent())
+            await asyncio.wait([tasks[0], waiting], return_when=asyncio.FIRST_COMPLETED)
+            if not tasks[0].done():
+                await asyncio.wait(tasks, timeout=hedge_after)
+            if tasks[0].done():
+                return tasks[0].result(), attempts[0]
+
+            # Too slow - race a second request and cancel whichever loses
+            self.hedges += 1
+            attempts.append(Attempt())
+            tasks.append(asyncio.ensure_future(self._timed(fn, attempts[1])))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), attempts[tasks.index(task)]
+                if not pending:
+                    raise task.exception()
+        finally:
+            if waiting is not None:
+                waiting.cancel()
+            for task in tasks:
+                task.cancel()
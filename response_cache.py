@@ -0,0 +1,235 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================
+# RESPONSE CACHE
+# ============================================
+# Sits in front of DebateLLM's Groq calls in both scripts.
+# Two tiers:
+#   - an in-memory LRU for the hot entries (same process)
+#   - a SQLite file that survives restarts
+# Entries expire after ttl_seconds, and each tier is capped in size. The
+# SQLite file is only opened (and created) on the first lookup.
+#
+# On the event loop, use get_any_async: memory hits answer at once and the
+# SQLite tier is read in a thread. Every SQLite write (new replies, last-used
+# times, pruning) goes through one background writer thread, so a commit
+# never holds up the loop.
+#
+# With replay=True nothing ever expires or gets overwritten, so running the
+# same debate again replays exactly the same replies (handy for demos).
+
+
+def make_cache_key(persona, messages, model, temperature, max_tokens):
+    """Hash everything that affects a completion into a cache key"""
+    payload = json.dumps(
+        {
+            "persona": persona,
+            "messages": messages,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU memory cache backed by a SQLite table, with TTL and size limits"""
+
+    # Prune the SQLite tier every this many writes rather than on every insert
+    PRUNE_EVERY = 100
+
+    def __init__(self, db_path="response_cache.sqlite3", max_memory_entries=512,
+                 max_db_entries=10000, ttl_seconds=7 * 24 * 3600, replay=False):
+        self.max_memory_entries = max_memory_entries
+        self.max_db_entries = max_db_entries
+        self.ttl_seconds = ttl_seconds
+        self.replay = replay
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()  # key -> (created_at, response)
+        self._lock = threading.Lock()  # Memory tier and counters (never held during disk I/O)
+
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._db_writes = 0
+        self._writes = queue.Queue()
+        self._writer = None
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        return self.get_any([key])[1]
+
+    def get_any(self, keys):
+        """Return (key, response) for the first of keys that's cached, or (None, None); counts as one lookup"""
+        now = time.time()
+        key, response = self._memory_lookup(keys, now)
+        if response is None and self.db_path:
+            key, response = self._db_lookup(keys, now)
+        return self._counted(key, response)
+
+    async def get_any_async(self, keys):
+        """get_any for the event loop: the SQLite tier is read in a thread"""
+        now = time.time()
+        key, response = self._memory_lookup(keys, now)
+        if response is None and self.db_path:
+            key, response = await asyncio.to_thread(self._db_lookup, keys, now)
+        return self._counted(key, response)
+
+    def put(self, key, response):
+        """Store a response in both tiers (the SQLite write happens in the background)"""
+        now = time.time()
+        with self._lock:
+            # In replay mode the first recorded reply is the one that gets replayed
+            if self.replay and key in self._memory:
+                return
+            self._remember(key, now, response)
+        if self.db_path:
+            self._submit(functools.partial(self._db_put, key, response, now))
+
+    def flush(self):
+        """Block until every queued SQLite write is done"""
+        if self._writer is not None:
+            self._writes.join()
+
+    def close(self):
+        """Close the SQLite connection once pending writes are done (the memory tier keeps working)"""
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self.db_path = None
+
+    def _counted(self, key, response):
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            return key, response
+
+    def _memory_lookup(self, keys, now):
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is None:
+                    continue
+                created_at, response = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return key, response
+                del self._memory[key]
+        return None, None
+
+    def _db_lookup(self, keys, now):
+        # Blocking read; bookkeeping writes are left to the writer thread
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return None, None
+            for key in keys:
+                row = db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                response, created_at = row
+                if self._expired(created_at, now):
+                    self._submit(functools.partial(self._db_run, "DELETE FROM responses WHERE key = ?", (key,)))
+                    continue
+                self._submit(functools.partial(
+                    self._db_run, "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                ))
+                with self._lock:
+                    self._remember(key, created_at, response)
+                return key, response
+        return None, None
+
+    def _db_put(self, key, response, now):
+        with self._db_lock:
+            db = self._connect()
+            if db is None:
+                return
+            verb = "INSERT OR IGNORE" if self.replay else "INSERT OR REPLACE"
+            db.execute(
+                f"{verb} INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._db_writes += 1
+            if self._db_writes % self.PRUNE_EVERY == 0:
+                self._prune_db(now)
+            db.commit()
+
+    def _db_run(self, sql, params):
+        with self._db_lock:
+            db = self._connect()
+            if db is not None:
+                db.execute(sql, params)
+                db.commit()
+
+    def _submit(self, job):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="response-cache-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._writes.put(job)
+
+    def _write_loop(self):
+        while True:
+            job = self._writes.get()
+            try:
+                job()
+            except sqlite3.Error as error:
+                # Losing a cache write only costs a Groq call later
+                print(f"⚠️ Couldn't save to the response cache: {error}")
+            finally:
+                self._writes.task_done()
+
+    def _expired(self, created_at, now):
+        return not self.replay and now - created_at > self.ttl_seconds
+
+    def _connect(self):
+        # Called with the database lock held; None when there's no SQLite tier
+        if self._db is None and self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, created_at, response):
+        # Called with the lock held
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_db(self, now):
+        if not self.replay:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        # Drop the least recently used rows beyond the size cap
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_db_entries,),
+        )
@@ -0,0 +1,250 @@
+import atexit
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+# ============================================
+# CRASH-SAFE TRANSCRIPT STORE
+# ============================================
+# Every debate gets its own append-only JSONL file. A line is written (and
+# fsynced) the moment something happens, so a crash or a Groq outage never
+# loses a reply that was already paid for:
+#   {"event": "start",   "topic": ..., "rounds": ..., "participants": [...], "simultaneous": ...}
+#   {"event": "round",   "round": 0, "order": ["LogicalBot", ...]}
+#   {"event": "turn",    "round": 0, "speaker": "LogicalBot", "text": ...}
+#   {"event": "summary", "text": ...}
+#   {"event": "end",     "scores": {...}}
+#
+# Starting the same debate again (same topic, rounds, bots and mode) picks
+# up the unfinished file: recorded round orders, replies and summaries are
+# replayed in order instead of being regenerated, and new lines are appended
+# after them.
+#
+# Lines are written by one background thread per store, in order, so an
+# fsync never holds up the event loop; a debate is only released (and can
+# only be resumed) once its queued lines are on disk. Only the newest
+# max_resumable transcripts are looked at when resuming, so the first debate
+# doesn't have to read a directory full of old ones.
+
+
+class DebateTranscript:
+    """One debate's transcript file; replays recorded events, then appends new ones"""
+
+    def __init__(self, path, events=(), fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.debate_id = os.path.splitext(os.path.basename(path))[0]
+
+        self._orders = {}
+        self._replies = {}
+        self._summaries = []
+        for event in events:
+            if event["event"] == "round":
+                self._orders[event["round"]] = event["order"]
+            elif event["event"] == "turn":
+                self._replies[(event["round"], event["speaker"])] = event["text"]
+            elif event["event"] == "summary":
+                self._summaries.append(event["text"])
+        self.saved_turns = len(self._replies)
+
+        self._store = None
+        self._lock = threading.Lock()
+
+    @property
+    def resumed(self):
+        return self.saved_turns > 0
+
+    def round_order(self, round_num, participants, rng):
+        """This round's speaking order: the recorded one when resuming, else a fresh shuffle"""
+        order = list(participants)
+        # Always shuffle so a seeded rng stays in step with the original run
+        rng.shuffle(order)
+
+        recorded = self._orders.get(round_num)
+        if recorded is not None:
+            by_name = {p["name"]: p for p in participants}
+            return [by_name[name] for name in recorded]
+
+        self._orders[round_num] = [p["name"] for p in order]
+        self._write({"event": "round", "round": round_num, "order": self._orders[round_num]})
+        return order
+
+    def saved_reply(self, round_num, speaker):
+        """The reply recorded before the debate was interrupted (None if there isn't one)"""
+        return self._replies.get((round_num, speaker))
+
+    def log_turn(self, round_num, speaker, text):
+        self._replies[(round_num, speaker)] = text
+        self._write({"event": "turn", "round": round_num, "speaker": speaker, "text": text})
+
+    def next_saved_summary(self):
+        """Summaries come back in the order they were made (None once they run out)"""
+        return self._summaries.pop(0) if self._summaries else None
+
+    def log_summary(self, text):
+        self._write({"event": "summary", "text": text})
+
+    def finish(self, scores):
+        """Mark the debate complete so it's never resumed"""
+        self._write({"event": "end", "scores": dict(scores)})
+        self.close()
+
+    def close(self):
+        """Release the debate; an unfinished one can be resumed later"""
+        if self._store:
+            store, self._store = self._store, None
+            # After the lines still waiting to be written
+            store.submit(functools.partial(store.release, self))
+
+    def _write(self, event):
+        event["time"] = round(time.time(), 3)
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        if self._store:
+            self._store.submit(functools.partial(self._append, line))
+        else:
+            self._append(line)
+
+    def _append(self, line):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+
+class TranscriptStore:
+    """A directory of per-debate JSONL transcripts with resume support"""
+
+    def __init__(self, directory="transcripts", fsync=True, max_resumable=200):
+        self.directory = directory
+        self.fsync = fsync
+        self.max_resumable = max_resumable  # Only the newest transcripts are checked for resuming
+
+        self._lock = threading.Lock()
+        self._writes = queue.Queue()
+        self._writer = None
+        self._active = set()      # Paths of debates running right now (never resumed twice)
+        self._unfinished = None   # debate key -> paths of interrupted debates, oldest first
+
+    def open(self, topic, num_rounds, participants, simultaneous=False, resume=True):
+        """Resume the latest matching interrupted debate, or start a new transcript (reads files - call it off the event loop)"""
+        key = self._key(topic, num_rounds, [p["name"] for p in participants], simultaneous)
+
+        with self._lock:
+            if resume:
+                self._load_index()
+                candidates = self._unfinished.get(key, [])
+                while candidates:
+                    path = candidates.pop()
+                    events = self._read_events(path)
+                    if events and events[-1]["event"] != "end":
+                        self._active.add(path)
+                        transcript = DebateTranscript(path, events, self.fsync)
+                        transcript._store = self
+                        return transcript
+
+            debate_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            path = os.path.join(self.directory, f"{debate_id}.jsonl")
+            self._active.add(path)
+        # Created with the first transcript, not when the store is set up
+        os.makedirs(self.directory, exist_ok=True)
+
+        transcript = DebateTranscript(path, fsync=self.fsync)
+        transcript._store = self
+        transcript._write({
+            "event": "start",
+            "debate_id": debate_id,
+            "topic": topic,
+            "rounds": num_rounds,
+            "participants": [p["name"] for p in participants],
+            "simultaneous": simultaneous,
+        })
+        return transcript
+
+    def submit(self, job):
+        """Run job() on the writer thread, after every job submitted before it"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="transcript-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._writes.put(job)
+
+    def flush(self):
+        """Block until every queued line is on disk"""
+        if self._writer is not None:
+            self._writes.join()
+
+    def release(self, transcript):
+        with self._lock:
+            self._active.discard(transcript.path)
+            # Still unfinished (stopped by an error or a closed tab) - resumable later
+            if self._unfinished is not None:
+                events = self._read_events(transcript.path)
+                if events and events[0]["event"] == "start" and events[-1]["event"] != "end":
+                    self._unfinished.setdefault(self._event_key(events[0]), []).append(transcript.path)
+
+    def _load_index(self):
+        # Scan the directory once; after that the index is kept up to date in memory
+        if self._unfinished is not None:
+            return
+        self._unfinished = {}
+        if not os.path.isdir(self.directory):
+            return
+        # File names start with the time the debate began, so this is oldest first
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+        for name in names[-self.max_resumable:]:
+            path = os.path.join(self.directory, name)
+            if path in self._active:
+                continue
+            events = self._read_events(path)
+            if events and events[0]["event"] == "start" and events[-1]["event"] != "end":
+                self._unfinished.setdefault(self._event_key(events[0]), []).append(path)
+
+    def _write_loop(self):
+        while True:
+            job = self._writes.get()
+            try:
+                job()
+            except OSError as error:
+                # A full disk shouldn't take the debate down with it
+                print(f"⚠️ Couldn't save the transcript: {error}")
+            finally:
+                self._writes.task_done()
+
+    @staticmethod
+    def _read_events(path):
+        """Read every complete line; a line torn by a crash is cut off the file"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        events = []
+        end = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break  # Anything after a corrupt line can't be trusted
+            end += len(line)
+
+        if end < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return events
+
+    @classmethod
+    def _event_key(cls, start):
+        return cls._key(start["topic"], start["rounds"], start["participants"], start["simultaneous"])
+
+    @staticmethod
+    def _key(topic, num_rounds, names, simultaneous):
+        return (topic.strip(), int(num_rounds), tuple(names), bool(simultaneous))